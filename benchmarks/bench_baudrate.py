@@ -0,0 +1,154 @@
+"""
+Benchmark de l'identification des capteurs (baudrate et type) par connect_to_ports.
+
+Crée --ports pseudo-terminaux jouant chacun un capteur à un baudrate réel
+tiré parmi les candidats: tant que le port est configuré au bon baudrate,
+le capteur émet à --rate Hz des trames 'type:valeur' (ou, pour un port sur
+--bare, des valeurs nues comme les anciens firmwares), sinon des octets
+parasites (comme un vrai port mal réglé). Compare:
+  - l'ancienne connexion (premier baudrate qui s'ouvre),
+  - l'identification de mesure_server (tous les ports écoutés à la fois,
+    classement des trames par préfixe ou plage de valeurs),
+  - un redémarrage avec le cache d'identité des ports renseigné par
+    l'autodétection (connexion directe, sans écoute).
+
+Usage: python benchmarks/bench_baudrate.py [--ports 4] [--rate 10] [--bare 2]
+"""
+import argparse
+import logging
+import os
+import pty
+import random
+import sys
+import tempfile
+import termios
+import threading
+import time
+from pathlib import Path
+
+import serial
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import mesure_server  # noqa: E402
+
+SPEEDS = {getattr(termios, f"B{rate}"): rate for rate in (9600, 19200, 38400, 57600, 115200)}
+
+
+class FakeSensor(threading.Thread):
+    """Capteur simulé derrière un pseudo-terminal"""
+
+    def __init__(self, sensor, value, baudrate, rate, seed, prefixed=True):
+        super().__init__(daemon=True)
+        self.master, self.slave = pty.openpty()
+        os.set_blocking(self.master, False)
+        self.device = os.ttyname(self.slave)
+        self.sensor = sensor
+        self.value = value
+        self.prefixed = prefixed
+        self.baudrate = baudrate
+        self.interval = 1 / rate
+        self.rng = random.Random(seed)
+        self.stop = threading.Event()
+
+    def run(self):
+        while not self.stop.wait(self.interval):
+            speed = SPEEDS.get(termios.tcgetattr(self.master)[4])
+            if speed == self.baudrate:
+                value = self.value if isinstance(self.value, int) else round(self.value + self.rng.uniform(-0.2, 0.2), 2)
+                frame = (f"{self.sensor}:{value}\n" if self.prefixed else f"{value}\n").encode()
+            else:
+                frame = bytes(self.rng.choice((0x0a, *range(0x80, 0x100))) for _ in range(12))
+            try:
+                os.write(self.master, frame)
+            except BlockingIOError:
+                pass
+
+    def close(self):
+        self.stop.set()
+        self.join()
+        os.close(self.master)
+        os.close(self.slave)
+
+
+def legacy_connect(ports):
+    """Ancienne connexion: premier baudrate qui s'ouvre"""
+    chosen = {}
+    for port in ports:
+        for baudrate in [9600, 57600, 115200, 38400, 19200]:
+            try:
+                serial.Serial(port, baudrate, timeout=1).close()
+                chosen[port] = baudrate
+                break
+            except serial.SerialException:
+                continue
+    return chosen
+
+
+def connect(expected):
+    start = time.perf_counter()
+    connections = mesure_server.connect_to_ports(list(expected))
+    elapsed = time.perf_counter() - start
+    detected = {info['port_path']: info['baudrate'] for info in connections.values()}
+    for info in connections.values():
+        info['serial'].close()
+    return elapsed, detected, sum(detected.get(port) == rate for port, rate in expected.items())
+
+
+def identified(fakes):
+    """Capteurs reconnus d'après le cache d'identité renseigné par connect_to_ports"""
+    cache = mesure_server.get_port_identity_cache()
+    return {fake.device: (cache.lookup(mesure_server.serial_port_info[fake.device]) or {}).get('sensor')
+            for fake in fakes}
+
+
+def main(args):
+    rng = random.Random(7)
+    sensors = [('poids', 70.5), ('temperature', 36.6), ('taille', 1.75),
+               ('validation', mesure_server.refValidateCard)]
+    fakes = [FakeSensor(*sensors[index % len(sensors)], rng.choice(mesure_server.BAUDRATES), args.rate, index,
+                        prefixed=index >= args.bare)
+             for index in range(args.ports)]
+    for fake in fakes:
+        fake.start()
+    expected = {fake.device: fake.baudrate for fake in fakes}
+    # Adaptateurs USB fictifs (identité: numéro de série) pour le cache
+    for index, fake in enumerate(fakes):
+        mesure_server.serial_port_info[fake.device] = mesure_server.SerialPortInfo(
+            fake.device, os.path.basename(fake.device), 'ch341-uart', 'usb-serial',
+            '1a86', '7523', f"SN{index:04d}", location=f"1-1.{index + 1}:1.0")
+    cache_dir = tempfile.TemporaryDirectory()
+    mesure_server.PORT_CACHE_FILE = os.path.join(cache_dir.name, 'ports.json')
+    try:
+        start = time.perf_counter()
+        legacy = legacy_connect(list(expected))
+        legacy_time = time.perf_counter() - start
+        legacy_ok = sum(legacy[port] == rate for port, rate in expected.items())
+
+        detect_time, detected, detect_ok = connect(expected)
+        sensors_found = identified(fakes)
+        cached_time, _, cached_ok = connect(expected)
+
+        print(f"premier qui s'ouvre : {legacy_time * 1000:>7.1f} ms, {legacy_ok}/{len(expected)} baudrates corrects")
+        print(f"identification      : {detect_time * 1000:>7.1f} ms, {detect_ok}/{len(expected)} baudrates corrects, "
+              f"{sum(sensors_found[fake.device] == fake.sensor for fake in fakes)}/{len(fakes)} capteurs reconnus "
+              f"(borne {mesure_server.BAUD_PROBE_TIMEOUT:.1f} s)")
+        print(f"avec cache          : {cached_time * 1000:>7.1f} ms, {cached_ok}/{len(expected)} baudrates corrects")
+        for fake in fakes:
+            kind = "préfixé" if fake.prefixed else "nu"
+            print(f"  {fake.device}: {fake.sensor:<11} {kind:<7} réel {fake.baudrate:>6}, "
+                  f"détecté {detected.get(fake.device, '-'):>6} ({sensors_found[fake.device]}), "
+                  f"ancien {legacy.get(fake.device, '-'):>6}")
+    finally:
+        for fake in fakes:
+            fake.close()
+        cache_dir.cleanup()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--ports', type=int, default=4)
+    parser.add_argument('--rate', type=float, default=10.0, help="cadence d'émission des capteurs (Hz)")
+    parser.add_argument('--bare', type=int, default=2, help="ports émettant des valeurs nues (sans préfixe)")
+    mesure_server.logger.setLevel(logging.WARNING)
+    main(parser.parse_args())
@@ -0,0 +1,74 @@
+"""
+Benchmark de diffusion des mises à jour poussées: coût de fan-out en
+fonction du nombre de clients abonnés (kiosques / écrans).
+
+Le serveur WebSocket de mesure_server est démarré dans ce processus; N
+clients s'abonnent puis des valeurs sont publiées. Les statistiques
+proviennent de broadcast_stats (durée de chaque diffusion).
+
+Usage: python benchmarks/bench_broadcast.py [--clients 1 10 50 200] [--updates 200]
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import websockets  # noqa: E402
+
+import mesure_server  # noqa: E402
+
+
+async def run(clients_count, updates):
+    mesure_server.broadcast_stats = mesure_server.BroadcastStats()
+    clients = []
+    for _ in range(clients_count):
+        ws = await websockets.connect('ws://127.0.0.1:8765')
+        await ws.recv()
+        await ws.send('subscribe')
+        await ws.recv()
+        clients.append(ws)
+
+    values = [60.0 + (i % 2) + i * 0.001 for i in range(updates)]
+    # Deltas texte: 'Delta:<seq>:poids:<valeur>'
+    last = f":poids:{values[-1]}"
+
+    async def drain(ws):
+        # Les clients lents peuvent recevoir moins de messages (fusion)
+        while not (await ws.recv()).endswith(last):
+            pass
+
+    readers = [asyncio.create_task(drain(ws)) for ws in clients]
+    start = time.perf_counter()
+    for value in values:
+        mesure_server.publish_sensor_value(mesure_server.POIDS, value)
+        await asyncio.sleep(0)
+    await asyncio.gather(*readers)
+    elapsed = time.perf_counter() - start
+
+    dropped = sum(session.dropped for session in mesure_server.client_sessions.values())
+    for ws in clients:
+        await ws.close()
+    stats = mesure_server.broadcast_stats
+    print(f"{clients_count:>5} clients: {stats.summary()} "
+          f"livraison={updates * clients_count / elapsed:,.0f} msg/s fusionnés={dropped}")
+
+
+async def main(args):
+    server = asyncio.create_task(mesure_server.start_websocket_server())
+    await asyncio.sleep(0.3)
+    for count in args.clients:
+        await run(count, args.updates)
+    server.cancel()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 10, 50, 200])
+    parser.add_argument('--updates', type=int, default=200)
+    mesure_server.logger.setLevel(logging.WARNING)
+    logging.getLogger('websockets').setLevel(logging.WARNING)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,82 @@
+"""
+Benchmark du débit de commandes (all-mesure, get-*, status) avec de
+nombreux tableaux de bord connectés, avec et sans cache de réponses.
+
+Chaque client envoie ses commandes en boucle fermée pendant --duration
+secondes pendant qu'une tâche publie de nouvelles valeurs (--rate par
+seconde), ce qui invalide régulièrement le cache.
+
+Usage: python benchmarks/bench_commands.py [--clients 50] [--duration 3] [--rate 10]
+"""
+import argparse
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import websockets  # noqa: E402
+
+import mesure_server  # noqa: E402
+
+COMMANDS = ["all-mesure", "get-poid", "get-temperature", "get-taille", "status", "get-sensors"]
+
+
+class NoCache(mesure_server.ResponseCache):
+    """Cache désactivé: chaque réponse est reformatée"""
+
+    def get(self, snapshot, key, render):
+        self.misses += 1
+        return render(snapshot)
+
+
+async def client(stop, counter):
+    async with websockets.connect('ws://127.0.0.1:8765') as ws:
+        await ws.recv()
+        i = 0
+        while not stop.is_set():
+            await ws.send(COMMANDS[i % len(COMMANDS)])
+            await ws.recv()
+            i += 1
+        counter.append(i)
+
+
+async def publisher(stop, rate):
+    i = 0
+    while not stop.is_set():
+        mesure_server.publish_sensor_value(mesure_server.POIDS, 60.0 + (i % 50) * 0.1)
+        i += 1
+        await asyncio.sleep(1 / rate)
+
+
+async def run(label, cache, args):
+    mesure_server.response_cache = cache
+    stop = asyncio.Event()
+    counter = []
+    tasks = [asyncio.create_task(client(stop, counter)) for _ in range(args.clients)]
+    tasks.append(asyncio.create_task(publisher(stop, args.rate)))
+    await asyncio.sleep(args.duration)
+    stop.set()
+    await asyncio.gather(*tasks)
+    print(f"{label:>10}: {sum(counter) / args.duration:,.0f} commandes/s "
+          f"({args.clients} clients, {cache.summary()})")
+
+
+async def main(args):
+    mesure_server.publish_sensor_values({mesure_server.TEMPERATURE: 36.6, mesure_server.TAILLE: 1.75})
+    server = asyncio.create_task(mesure_server.start_websocket_server())
+    await asyncio.sleep(0.3)
+    await run("sans cache", NoCache(), args)
+    await run("avec cache", mesure_server.ResponseCache(), args)
+    server.cancel()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--duration', type=float, default=3.0)
+    parser.add_argument('--rate', type=float, default=10.0, help="publications par seconde")
+    mesure_server.logger.setLevel(logging.WARNING)
+    logging.getLogger('websockets').setLevel(logging.WARNING)
+    asyncio.run(main(parser.parse_args()))
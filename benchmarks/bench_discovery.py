@@ -0,0 +1,128 @@
+"""
+Benchmark du temps de découverte des ports série au démarrage.
+
+Construit une arborescence sysfs et /dev factice avec --legacy ports ttyS
+sans matériel (type 0), --uarts ports ttyS câblés et --usb adaptateurs USB,
+puis compare:
+  - l'ancienne découverte (glob /dev puis ouverture de test séquentielle de
+    chaque nœud),
+  - la découverte sysfs + tests d'ouverture parallèles de mesure_server.
+L'ouverture d'un port est simulée par une attente de --open-ms ms (un nœud
+sans matériel répond aussi lentement qu'un vrai port).
+
+Usage: python benchmarks/bench_discovery.py [--legacy 32] [--uarts 2] [--usb 4] [--open-ms 25]
+"""
+import argparse
+import glob
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import mesure_server  # noqa: E402
+
+
+def write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(content + "\n")
+
+
+def build_tree(root, legacy, uarts, usb):
+    """Crée root/sys/class/tty et root/dev; retourne (sysfs_root, dev_root)"""
+    sysfs = os.path.join(root, 'sys')
+    tty_root = os.path.join(sysfs, 'class', 'tty')
+    dev_root = os.path.join(root, 'dev')
+    os.makedirs(tty_root)
+    os.makedirs(dev_root)
+    os.makedirs(os.path.join(sysfs, 'bus', 'usb-serial'))
+    os.makedirs(os.path.join(sysfs, 'bus', 'platform'))
+
+    def tty(name, device_dir, subsystem, driver):
+        entry = os.path.join(sysfs, 'devices', 'virtual', 'tty-entries', name)
+        os.makedirs(device_dir, exist_ok=True)
+        os.makedirs(entry)
+        os.symlink(device_dir, os.path.join(entry, 'device'))
+        os.symlink(os.path.join(sysfs, 'bus', subsystem), os.path.join(device_dir, 'subsystem'))
+        driver_dir = os.path.join(sysfs, 'bus', subsystem, 'drivers', driver)
+        os.makedirs(driver_dir, exist_ok=True)
+        os.symlink(driver_dir, os.path.join(device_dir, 'driver'))
+        os.symlink(entry, os.path.join(tty_root, name))
+        Path(dev_root, name).touch()
+        return entry
+
+    for index in range(legacy + uarts):
+        entry = tty(f"ttyS{index}", os.path.join(sysfs, 'devices', 'platform', f'serial8250.{index}'),
+                    'platform', 'serial8250')
+        write(os.path.join(entry, 'type'), '4' if index < uarts else '0')
+
+    for index in range(usb):
+        usb_device = os.path.join(sysfs, 'devices', 'usb1', '1-1', f'1-1.{index + 1}')
+        write(os.path.join(usb_device, 'idVendor'), '1a86')
+        write(os.path.join(usb_device, 'idProduct'), '7523')
+        write(os.path.join(usb_device, 'product'), 'USB Serial')
+        write(os.path.join(usb_device, 'serial'), f'SN{index:04d}')
+        interface = os.path.join(usb_device, f'1-1.{index + 1}:1.0')
+        tty(f"ttyUSB{index}", os.path.join(interface, f'ttyUSB{index}'), 'usb-serial', 'ch341-uart')
+
+    # Consoles virtuelles: présentes dans sysfs, sans périphérique
+    for index in range(16):
+        os.makedirs(os.path.join(tty_root, f"tty{index}"))
+    return tty_root, dev_root
+
+
+def legacy_discover(dev_root, probe):
+    """Ancienne découverte: glob puis ouverture séquentielle de chaque nœud"""
+    ports = []
+    for prefix in mesure_server.SERIAL_PORT_PREFIXES:
+        ports.extend(sorted(glob.glob(os.path.join(dev_root, prefix + '*'))))
+    return [port for port in ports if probe(port)]
+
+
+def main(args):
+    delay = args.open_ms / 1000
+    opened = []
+
+    # Les nœuds ttyS sans UART échouent à l'ouverture (EIO), après le même délai
+    dead = {f"ttyS{index}" for index in range(args.uarts, args.uarts + args.legacy)}
+
+    def fake_probe(device):
+        opened.append(device)
+        time.sleep(delay)
+        return os.path.basename(device) not in dead
+
+    mesure_server.probe_serial_port = fake_probe
+    with tempfile.TemporaryDirectory() as root:
+        sysfs_root, dev_root = build_tree(root, args.legacy, args.uarts, args.usb)
+
+        start = time.perf_counter()
+        legacy_ports = legacy_discover(dev_root, fake_probe)
+        legacy_time = time.perf_counter() - start
+        legacy_opened = len(opened)
+
+        opened.clear()
+        start = time.perf_counter()
+        ports = mesure_server.discover_serial_ports(sysfs_root, dev_root)
+        new_time = time.perf_counter() - start
+
+        print(f"glob + séquentiel : {legacy_time * 1000:>8.1f} ms, {legacy_opened} ouvertures, {len(legacy_ports)} ports")
+        print(f"sysfs + parallèle : {new_time * 1000:>8.1f} ms, {len(opened)} ouvertures, {len(ports)} ports "
+              f"({mesure_server.DISCOVERY_WORKERS} workers)")
+        for device in ports:
+            info = mesure_server.serial_port_info[device]
+            if info.vid:
+                print(f"  {info.name}: {info.vid}:{info.pid} {info.product} série={info.serial_number} @ {info.location}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--legacy', type=int, default=32, help="ports ttyS sans matériel")
+    parser.add_argument('--uarts', type=int, default=2, help="ports ttyS câblés")
+    parser.add_argument('--usb', type=int, default=4, help="adaptateurs USB-série")
+    parser.add_argument('--open-ms', type=float, default=25.0, help="durée simulée d'une ouverture de test")
+    mesure_server.logger.setLevel(logging.WARNING)
+    main(parser.parse_args())
@@ -0,0 +1,98 @@
+"""
+Benchmark de l'attachement/détachement à chaud des ports série.
+
+Lance la boucle de lecture (select) sans aucun port, avec le gestionnaire
+hotplug surveillant un répertoire /dev temporaire, puis y « branche » un
+capteur (lien ttyUSB0 vers un pseudo-terminal émettant à --rate Hz) et
+mesure le délai jusqu'à l'attachement du port et jusqu'à sa première
+lecture publiée, puis le délai de détachement au débranchement. Le cycle est
+répété --cycles fois: le premier branchement passe par l'identification,
+les suivants par le cache d'identité des ports.
+
+Usage: python benchmarks/bench_hotplug.py [--cycles 5] [--rate 20]
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import mesure_server  # noqa: E402
+from bench_baudrate import FakeSensor  # noqa: E402
+
+
+def wait_for(condition, timeout=10.0):
+    """Attend qu'une condition soit vraie; retourne le délai (s)"""
+    start = time.perf_counter()
+    while not condition():
+        if time.perf_counter() - start > timeout:
+            raise TimeoutError("condition non atteinte")
+        time.sleep(0.0005)
+    return time.perf_counter() - start
+
+
+def main(args):
+    fake = FakeSensor('poids', 70.5, 57600, args.rate, 1)
+    fake.start()
+    with tempfile.TemporaryDirectory() as root:
+        dev_root = os.path.join(root, 'dev')
+        sysfs_root = os.path.join(root, 'sys')
+        os.makedirs(dev_root)
+        os.makedirs(sysfs_root)
+        mesure_server.PORT_CACHE_FILE = os.path.join(root, 'ports.json')
+
+        # Adaptateur USB fictif (identité stable pour le cache)
+        def fake_sysfs(name, sysfs, dev):
+            return mesure_server.SerialPortInfo(os.path.join(dev, name), name, 'ch341-uart', 'usb-serial',
+                                                '1a86', '7523', 'SN0001', location='1-1.2:1.0')
+        mesure_server.read_tty_sysfs = fake_sysfs
+
+        connections = {}
+        hotplug = mesure_server.start_port_hotplug(connections, dev_root, sysfs_root)
+        if hotplug is None:
+            sys.exit("inotify indisponible")
+        reader = threading.Thread(target=mesure_server.select_serial_ports, args=(connections,), name="SerialReader")
+        reader.start()
+
+        link = os.path.join(dev_root, 'ttyUSB0')
+        results = []
+        try:
+            for cycle in range(args.cycles):
+                version = mesure_server.current_snapshot.version
+                os.symlink(fake.device, link)
+                attach = wait_for(lambda: 'ttyUSB0' in connections)
+                first = wait_for(lambda: mesure_server.current_snapshot.version > version) + attach
+                time.sleep(0.2)
+                os.unlink(link)
+                detach = wait_for(lambda: 'ttyUSB0' not in connections)
+                results.append((attach, first, detach))
+                kind = "identification" if cycle == 0 else "cache"
+                print(f"cycle {cycle + 1} ({kind:<14}): attaché {attach * 1000:>7.1f} ms, "
+                      f"1re lecture {first * 1000:>7.1f} ms, détaché {detach * 1000:>6.1f} ms")
+        finally:
+            mesure_server.shutdown_event.set()
+            reader.join()
+            mesure_server.stop_port_hotplug()
+            mesure_server.close_serial_connections(connections)
+            fake.close()
+
+        if len(results) > 1:
+            cached = results[1:]
+            print(f"médiane (cache): attaché {statistics.median(r[0] for r in cached) * 1000:.1f} ms, "
+                  f"1re lecture {statistics.median(r[1] for r in cached) * 1000:.1f} ms, "
+                  f"détaché {statistics.median(r[2] for r in cached) * 1000:.1f} ms; "
+                  f"thread de lecture inchangé ({reader.name})")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--cycles', type=int, default=5)
+    parser.add_argument('--rate', type=float, default=20.0, help="cadence d'émission du capteur (Hz)")
+    mesure_server.logger.setLevel(logging.WARNING)
+    main(parser.parse_args())
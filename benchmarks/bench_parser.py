@@ -0,0 +1,100 @@
+"""
+Microbenchmark du parsing des lignes capteurs: parse_sensor_data (str) vs
+parse_sensor_bytes (octets, table de préfixes précalculée).
+
+Avant la mesure, les deux parseurs sont comparés sur le corpus CORPUS: le
+script s'arrête si un résultat diffère.
+
+Usage: python benchmarks/bench_parser.py [--repeat 20000]
+"""
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import mesure_server  # noqa: E402
+
+# Corpus partagé: trames réelles, aliases, casse/espaces, cas invalides
+CORPUS = [
+    b"poids:70.5", b"poids:0", b"poids:500", b"poids:501", b"poids:-3",
+    b"weight:82.34", b"masse:65", b"Poids: 70.56 ", b"POIDS:70.5\r",
+    b"temperature:36.6", b"temp:37.25", b"Temp:38", b"  temp : 36.6  ",
+    b"validation:310502", b"card:310502", b"valid:310502.0", b"card:123",
+    b"validation:3.105e5", b"taille:1.75", b"size:1.8", b"height:1.655",
+    b"taille:1_75", b"temp:nan", b"poids:inf", b"poids:", b"poids:abc",
+    b"poids:70,5", b"inconnu:12", b"pas de separateur", b"", b"   ",
+    b":70", b"poids:70:5", b"\xffpoids:70.5", b"poids:7\xff0.5",
+    b"po\xc3\xafds:1", b"temp:\xd9\xa3\xd9\xa6", b"\x1ctemp:36.6\x1c",
+    b"taille:1.75\t", b"VALIDATION:310502", b"card:inf",
+]
+
+# Lignes représentatives du trafic réel pour la mesure de débit
+TRAFFIC = [b"poids:70.5", b"temp:36.6", b"taille:1.75", b"card:310502", b"temperature:37.1"]
+
+
+def parse_with_str(line):
+    sensor_type, value, success = mesure_server.parse_sensor_data(
+        line.decode('utf-8', errors='ignore').strip(), 'bench')
+    return (sensor_type, value) if success else None
+
+
+def parse_with_bytes(line):
+    return mesure_server.parse_sensor_bytes(line, 'bench')
+
+
+def check_corpus():
+    for line in CORPUS:
+        expected = parse_with_str(line)
+        got = parse_with_bytes(line)
+        got = tuple(got) if got is not None else None
+        if repr(expected) != repr(got):
+            raise SystemExit(f"Résultat différent pour {line!r}: str={expected!r} bytes={got!r}")
+    print(f"✅ Corpus: {len(CORPUS)} lignes, résultats identiques")
+
+
+def bench(name, func, lines, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for line in lines:
+            func(line)
+    elapsed = time.perf_counter() - start
+    rate = repeat * len(lines) / elapsed
+    print(f"{name:>6}: {rate:,.0f} lignes/s")
+    return rate
+
+
+def bench_framed(repeat):
+    """Chemin complet depuis le tampon du framer (bornes, sans copie de ligne)"""
+    framer = mesure_server.SerialLineFramer()
+    payload = b"\n".join(TRAFFIC) + b"\n"
+    count = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        framer.buffer += payload
+        buffer = framer.buffer
+        for frame_start, frame_end in framer.frames():
+            mesure_server.parse_sensor_bytes(buffer, 'bench', frame_start, frame_end)
+            count += 1
+    elapsed = time.perf_counter() - start
+    print(f"framer: {count / elapsed:,.0f} lignes/s (tampon + parse_sensor_bytes)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=20000)
+    args = parser.parse_args()
+
+    mesure_server.logger.setLevel(logging.CRITICAL)
+    check_corpus()
+
+    slow = bench('str', parse_with_str, TRAFFIC, args.repeat)
+    fast = bench('bytes', parse_with_bytes, TRAFFIC, args.repeat)
+    print(f"gain: x{fast / slow:.2f}")
+    bench_framed(args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark de la persistance SQLite (ReadingStore): débit d'insertion soutenu.
+
+Les lectures sont soumises aussi vite que possible par un thread producteur
+(comme le chemin série) pendant --duration secondes; on mesure le coût de
+soumission côté producteur et le débit réellement écrit sur disque, pour
+plusieurs tailles de lot. À titre de comparaison, une insertion avec commit
+par lecture est aussi mesurée.
+
+Lancer depuis le support à évaluer (ex: la carte SD du Pi): la base est créée
+dans --directory.
+
+Usage: python benchmarks/bench_persistence.py [--directory .] [--duration 3] [--batch 50 500 5000]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import mesure_server  # noqa: E402
+
+
+def bench_store(directory, batch_size, duration):
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        store = mesure_server.ReadingStore(os.path.join(tmp, "bench.db"), batch_size=batch_size)
+        store.start()
+        stop = threading.Event()
+        submitted = []
+
+        def producer():
+            count = 0
+            start = time.perf_counter()
+            while not stop.is_set():
+                for _ in range(1000):
+                    store.submit(time.time(), "poids", 70.5 + count % 10 * 0.1, "/dev/ttyUSB0")
+                    count += 1
+            submitted.append((count, time.perf_counter() - start))
+
+        thread = threading.Thread(target=producer)
+        start = time.perf_counter()
+        thread.start()
+        time.sleep(duration)
+        stop.set()
+        thread.join()
+        written_during = store.written
+        store.stop(timeout=60)
+        elapsed = time.perf_counter() - start
+
+        count, produce_time = submitted[0]
+        print(f"lot {batch_size:>6}: écrit {written_during / duration:>10,.0f} lectures/s soutenu, "
+              f"soumission {produce_time / count * 1e9:>6.0f} ns, "
+              f"total {store.written:,} en {elapsed:.1f}s ({store.batches} transactions, "
+              f"{store.dropped:,} abandonnées)")
+
+
+def bench_per_row_commit(directory, duration):
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        connection = mesure_server.ReadingStore.connect(os.path.join(tmp, "bench.db"))
+        count = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < duration:
+            connection.execute(mesure_server.ReadingStore.INSERT, (time.time(), "poids", 70.5, "/dev/ttyUSB0"))
+            connection.commit()
+            count += 1
+        elapsed = time.perf_counter() - start
+        connection.close()
+        print(f"commit par lecture: {count / elapsed:>10,.0f} lectures/s")
+
+
+def main(args):
+    bench_per_row_commit(args.directory, args.duration)
+    for batch_size in args.batch:
+        bench_store(args.directory, batch_size, args.duration)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--directory', default='.', help="répertoire de la base (support à évaluer)")
+    parser.add_argument('--duration', type=float, default=3.0)
+    parser.add_argument('--batch', type=int, nargs='+', default=[50, 500, 5000])
+    mesure_server.logger.setLevel(logging.WARNING)
+    main(parser.parse_args())
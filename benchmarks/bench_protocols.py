@@ -0,0 +1,69 @@
+"""
+Benchmark des formats de protocole (texte, JSON, binaire): octets sur le fil et coût d'encodage.
+
+Pour chaque format, mesure la taille d'une mise à jour de capteur et d'une
+réponse 'all-mesure' (charge utile et trame WebSocket serveur -> client,
+en-tête compris), ainsi que le temps d'encodage moyen sur --iterations
+encodages.
+
+Usage: python benchmarks/bench_protocols.py [--iterations 200000]
+"""
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import mesure_server  # noqa: E402
+
+
+def frame_size(payload):
+    """Taille d'une trame WebSocket non masquée (serveur -> client)"""
+    length = len(payload.encode() if isinstance(payload, str) else payload)
+    header = 2 if length < 126 else 4 if length < 65536 else 10
+    return length, length + header
+
+
+def measure(encode, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        encode()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main(args):
+    snapshot = mesure_server.publish_sensor_values({
+        mesure_server.POIDS: 70.5,
+        mesure_server.TEMPERATURE: 36.6,
+        mesure_server.TAILLE: 1.75,
+    })
+    spec = mesure_server.SENSOR_REGISTRY['poids']
+
+    print(f"{'format':>8} | {'màj octets':>10} | {'trame':>5} | {'encodage':>9} | "
+          f"{'all-mesure':>10} | {'trame':>5} | {'encodage':>9}")
+    for protocol in mesure_server.PROTOCOLS:
+        def update():
+            return mesure_server.encode_reading(protocol, spec, snapshot, snapshot[spec.sensor_id])
+
+        if protocol == mesure_server.PROTOCOL_TEXT:
+            def all_mesure():
+                return mesure_server.render_all_mesure_prefix(snapshot) + "validation:0"
+        else:
+            def all_mesure():
+                return mesure_server.encode_all_mesure(protocol, snapshot, None)
+
+        update_payload, update_frame = frame_size(update())
+        all_payload, all_frame = frame_size(all_mesure())
+        update_us = measure(update, args.iterations)
+        all_us = measure(all_mesure, args.iterations)
+        print(f"{protocol:>8} | {update_payload:>10} | {update_frame:>5} | {update_us:>6.2f} µs | "
+              f"{all_payload:>10} | {all_frame:>5} | {all_us:>6.2f} µs")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--iterations', type=int, default=200000)
+    mesure_server.logger.setLevel(logging.WARNING)
+    main(parser.parse_args())
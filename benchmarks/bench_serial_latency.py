@@ -0,0 +1,118 @@
+"""
+Benchmark de latence série: boucle de scrutation ('poll') vs boucle
+événementielle ('select').
+
+Des paires de pseudo-terminaux (pty) simulent les capteurs: un thread écrit
+des lignes 'type:valeur' à intervalles aléatoires côté maître, la boucle de
+lecture de mesure_server lit côté esclave. On mesure le délai entre
+l'écriture et l'appel à update_sensor_data, ainsi que le temps CPU consommé
+pendant une phase d'inactivité.
+
+Usage: python benchmarks/bench_serial_latency.py [--ports 4] [--samples 200]
+"""
+import argparse
+import logging
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import serial  # noqa: E402
+
+import mesure_server  # noqa: E402
+
+LINES = [b"poids:70.5\n", b"temp:36.6\n", b"taille:1.75\n"]
+
+
+def open_fake_ports(count):
+    """Crée des paires pty et ouvre le côté esclave comme un port série"""
+    masters = []
+    connections = {}
+    for i in range(count):
+        master, slave = os.openpty()
+        ser = serial.Serial(os.ttyname(slave), 9600, timeout=1)
+        os.close(slave)
+        masters.append(master)
+        connections[f"fake{i}"] = {
+            'serial': ser,
+            'port_path': ser.port,
+            'baudrate': 9600,
+            'last_data': None,
+            'error_count': 0,
+            'framer': mesure_server.SerialLineFramer(),
+        }
+    return masters, connections
+
+
+def run_mode(loop, ports, samples, idle):
+    masters, connections = open_fake_ports(ports)
+    received = []
+    arrived = threading.Event()
+
+    def fake_update(sensor_type, value, port_name):
+        received.append(time.perf_counter())
+        arrived.set()
+        return True
+
+    original = mesure_server.update_sensor_data
+    mesure_server.update_sensor_data = fake_update
+    mesure_server.shutdown_event.clear()
+    reader = threading.Thread(target=loop, args=(connections,), daemon=True)
+    reader.start()
+    time.sleep(0.3)
+
+    latencies = []
+    try:
+        # Phase d'inactivité: coût CPU à vide
+        cpu_start = time.process_time()
+        time.sleep(idle)
+        idle_cpu = time.process_time() - cpu_start
+
+        for _ in range(samples):
+            arrived.clear()
+            master = random.choice(masters)
+            sent = time.perf_counter()
+            os.write(master, random.choice(LINES))
+            if not arrived.wait(2):
+                continue
+            latencies.append((received[-1] - sent) * 1000)
+            time.sleep(random.uniform(0.0, 0.05))
+    finally:
+        mesure_server.shutdown_event.set()
+        reader.join(3)
+        mesure_server.update_sensor_data = original
+        for conn_info in connections.values():
+            conn_info['serial'].close()
+        for master in masters:
+            os.close(master)
+
+    return latencies, idle_cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--ports', type=int, default=4)
+    parser.add_argument('--samples', type=int, default=200)
+    parser.add_argument('--idle', type=float, default=3.0, help="durée de la phase inactive (s)")
+    args = parser.parse_args()
+
+    mesure_server.logger.setLevel(logging.WARNING)
+
+    for name, loop in (('poll', mesure_server.poll_serial_ports),
+                       ('select', mesure_server.select_serial_ports)):
+        latencies, idle_cpu = run_mode(loop, args.ports, args.samples, args.idle)
+        latencies.sort()
+        p99 = latencies[int(len(latencies) * 0.99) - 1] if latencies else float('nan')
+        print(f"{name:>6}: n={len(latencies)} "
+              f"moyenne={statistics.mean(latencies):.2f}ms "
+              f"p50={statistics.median(latencies):.2f}ms p99={p99:.2f}ms "
+              f"max={latencies[-1]:.2f}ms cpu_inactif={idle_cpu * 1000:.1f}ms/{args.idle:.0f}s")
+
+
+if __name__ == '__main__':
+    main()
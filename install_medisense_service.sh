@@ -182,7 +182,7 @@ TimeoutStopSec=30
 
 # Redémarrage automatique
 Restart=always
-RestartSec=10
+RestartSec=2
 
 # Logs
 StandardOutput=journal
@@ -193,6 +193,8 @@ SyslogIdentifier=medisense
 Environment=PYTHONPATH=$PROJECT_DIR
 Environment=PYTHONUNBUFFERED=1
 Environment=PYTHONDONTWRITEBYTECODE=1
+# Journal des lectures et instantané d'état (redémarrage avec les dernières valeurs)
+Environment=MEDISENSE_JOURNAL_DIR=$PROJECT_DIR/state
 
 # Sécurité
 NoNewPrivileges=true
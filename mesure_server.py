@@ -6,8 +6,22 @@ import websockets
 import logging
 import signal
 import sys
+import os
 import glob
-from typing import Optional, Dict, Any
+import selectors
+import sqlite3
+import queue
+import contextlib
+import ctypes
+import json
+import struct
+import mmap
+import zlib
+from array import array
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from collections.abc import MutableMapping
+from typing import Optional, Dict, Any, NamedTuple
 
 # Configuration du logging pour debug
 logging.basicConfig(
@@ -20,408 +34,3417 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Déclaration des variables globales pour stocker les données
-sensor_data: Dict[str, Any] = {
-    'poids': None,
-    'temperature': None,
-    'temp': None,  # Alias pour temperature
-    'validation': None,
-    'card': None,  # Alias pour validation
-    'taille': None,
-    'size': None,  # Alias pour taille
-}
+# Code de référence pour la validation
+refValidateCard: int = 310502
+
+class SensorSpec:
+    """
+    Description d'un capteur physique: un identifiant (index de stockage),
+    un nom canonique et les aliases acceptés dans le protocole texte
+    """
+    __slots__ = ('sensor_id', 'name', 'label', 'unit', 'precision', 'min_value', 'max_value',
+                 'expected_value', 'aliases', 'legacy_keys', 'is_code')
+
+    def __init__(self, sensor_id: int, name: str, label: str, unit: str, precision: int,
+                 aliases: tuple = (), legacy_keys: tuple = (),
+                 min_value: float = float('-inf'), max_value: float = float('inf'),
+                 expected_value: Optional[int] = None):
+        self.sensor_id = sensor_id
+        self.name = name
+        # Préfixe des réponses individuelles du protocole WebSocket (ex: 'Poids:70.5')
+        self.label = label
+        self.unit = unit
+        self.precision = precision
+        self.min_value = min_value
+        self.max_value = max_value
+        self.expected_value = expected_value
+        # Aliases reconnus en préfixe des trames série
+        self.aliases = aliases
+        # Aliases historiquement exposés comme clés de sensor_data
+        self.legacy_keys = legacy_keys
+        # Les capteurs à code (validation) attendent une valeur exacte
+        self.is_code = expected_value is not None
+
+    def convert(self, raw):
+        """
+        Convertit la valeur brute (str ou octets ASCII) selon le capteur
+        Raises: ValueError si la valeur n'est pas numérique
+        """
+        if self.is_code:
+            return int(float(raw))  # float puis int pour gérer "310502.0"
+        return round(float(raw), self.precision)
+
+    def accepts(self, value) -> bool:
+        """Valide une valeur (code attendu ou plage min/max)"""
+        if self.is_code:
+            return value == self.expected_value
+        return self.min_value <= value <= self.max_value
+
+    def __repr__(self):
+        return f"SensorSpec({self.sensor_id}, {self.name!r})"
+
+class SensorRegistry:
+    """Registre des capteurs avec index des noms et aliases construit une fois"""
+    __slots__ = ('specs', 'by_name', 'by_prefix')
+
+    def __init__(self, specs):
+        self.specs = tuple(specs)
+        self.by_name: Dict[str, SensorSpec] = {}
+        for index, spec in enumerate(self.specs):
+            if spec.sensor_id != index:
+                raise ValueError(f"{spec!r}: identifiant attendu {index}")
+            self.by_name[spec.name] = spec
+        for spec in self.specs:
+            for alias in spec.aliases:
+                self.by_name.setdefault(alias, spec)
+        # Même index, clés en octets pour le parseur binaire
+        self.by_prefix: Dict[bytes, SensorSpec] = {name.encode(): spec for name, spec in self.by_name.items()}
+
+    def resolve(self, name: str) -> Optional[SensorSpec]:
+        """Retourne le capteur correspondant à un nom canonique ou un alias"""
+        return self.by_name.get(name)
+
+    def __getitem__(self, name: str) -> SensorSpec:
+        return self.by_name[name]
+
+    def __iter__(self):
+        return iter(self.specs)
+
+    def __len__(self):
+        return len(self.specs)
+
+# Identifiants (index de stockage) des capteurs
+POIDS, TEMPERATURE, VALIDATION, TAILLE = range(4)
 
 # Configuration des capteurs avec validation
-SENSOR_CONFIG = {
-    'poids': {
-        'min_value': 0,
-        'max_value': 500,
-        'unit': 'kg',
-        'precision': 1,
-        'aliases': ['weight', 'masse']
-    },
-    'temperature': {
-        'min_value': 0,
-        'max_value': 50,
-        'unit': '°C',
-        'precision': 1,
-        'aliases': ['temp']
-    },
-    'temp': {
-        'min_value': 0,
-        'max_value': 50,
-        'unit': '°C',
-        'precision': 1,
-        'aliases': ['temperature']
-    },
-    'validation': {
-        'expected_value': 310502,
-        'unit': '',
-        'precision': 0,
-        'aliases': ['card', 'valid']
-    },
-    'card': {
-        'expected_value': 310502,
-        'unit': '',
-        'precision': 0,
-        'aliases': ['validation', 'valid']
-    },
-    'taille': {
-        'min_value': 0.5,
-        'max_value': 3.0,
-        'unit': 'm',
-        'precision': 2,
-        'aliases': ['size', 'height']
-    },
-    'size': {
-        'min_value': 0.5,
-        'max_value': 3.0,
-        'unit': 'm',
-        'precision': 2,
-        'aliases': ['taille', 'height']
-    }
-}
+SENSOR_REGISTRY = SensorRegistry([
+    SensorSpec(POIDS, 'poids', 'Poids', 'kg', 1, aliases=('weight', 'masse'),
+               min_value=0, max_value=500),
+    SensorSpec(TEMPERATURE, 'temperature', 'Température', '°C', 1, aliases=('temp',), legacy_keys=('temp',),
+               min_value=0, max_value=50),
+    SensorSpec(VALIDATION, 'validation', 'Validation', '', 0, aliases=('card', 'valid'), legacy_keys=('card',),
+               expected_value=refValidateCard),
+    SensorSpec(TAILLE, 'taille', 'Taille', 'm', 2, aliases=('size', 'height'), legacy_keys=('size',),
+               min_value=0.5, max_value=3.0),
+])
 
-# Code de référence pour la validation
-refValidateCard: int = 310502
+class SensorSnapshot:
+    """
+    État immuable des capteurs: une valeur par capteur (indexée par sensor_id),
+    un numéro de version incrémenté à chaque publication et son horodatage
+    """
+    __slots__ = ('version', 'values', 'timestamp', 'stale')
+
+    def __init__(self, version: int, values: tuple, timestamp: Optional[float] = None,
+                 stale: frozenset = frozenset()):
+        self.version = version
+        self.values = values
+        # Heure de publication (secondes depuis l'epoch)
+        self.timestamp = time.time() if timestamp is None else timestamp
+        # Capteurs dont la valeur est restaurée au démarrage, pas encore relue
+        self.stale = stale
+
+    def __getitem__(self, sensor_id: int):
+        return self.values[sensor_id]
+
+    def __repr__(self):
+        return f"SensorSnapshot(v{self.version}, {self.values!r})"
+
+class SensorDataView(MutableMapping):
+    """
+    Vue dictionnaire (compatibilité) sur l'instantané courant des capteurs:
+    les clés historiques ('temp', 'card', 'size') pointent vers le même
+    emplacement que leur capteur canonique
+    """
+
+    def __init__(self, registry: SensorRegistry):
+        self._keys: Dict[str, int] = {}
+        for spec in registry:
+            self._keys[spec.name] = spec.sensor_id
+            for key in spec.legacy_keys:
+                self._keys[key] = spec.sensor_id
+
+    def __getitem__(self, key):
+        return current_snapshot.values[self._keys[key]]
+
+    def __setitem__(self, key, value):
+        publish_sensor_value(self._keys[key], value)
+
+    def __delitem__(self, key):
+        raise TypeError("Les capteurs ne peuvent pas être supprimés")
+
+    def __iter__(self):
+        return iter(self._keys)
 
-# Lock pour la synchronisation des threads
+    def __len__(self):
+        return len(self._keys)
+
+# Déclaration des variables globales pour stocker les données: instantané
+# immuable remplacé atomiquement à chaque écriture (lecture sans verrou)
+current_snapshot = SensorSnapshot(0, (None,) * len(SENSOR_REGISTRY))
+sensor_data = SensorDataView(SENSOR_REGISTRY)
+
+# Lock sérialisant les écrivains (les lecteurs n'en ont pas besoin)
 data_lock = threading.Lock()
 
+class ReplayBuffer:
+    """
+    Historique borné des deltas publiés (séquence = version de l'instantané),
+    permettant à un client reconnecté de rattraper les changements manqués.
+    Les codes de validation, à usage unique, n'y figurent pas: un client qui
+    se reconnecte ne doit pas recevoir un code déjà consommé.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.entries = deque()
+        self.code_ids = frozenset(spec.sensor_id for spec in SENSOR_REGISTRY if spec.is_code)
+        # Version du dernier delta évincé: en deçà, l'historique est perdu
+        self.horizon = 0
+
+    def record(self, previous: SensorSnapshot, snapshot: SensorSnapshot, written=()) -> tuple:
+        """
+        Enregistre le delta entre deux instantanés (appelé sous data_lock)
+        Args:
+            previous, snapshot - Instantanés avant et après la publication
+            written - Capteurs écrits par la publication
+        Returns: Capteurs modifiés ((sensor_id, valeur), ...)
+        """
+        old_values = previous.values
+        # Une valeur restaurée confirmée par une lecture identique reste un
+        # changement: le client doit apprendre qu'elle n'est plus périmée.
+        # De même pour un code relu alors qu'il est encore en attente: il
+        # doit être poussé (et consommé) à nouveau
+        refreshed = (previous.stale - snapshot.stale).union(
+            sensor_id for sensor_id in written
+            if sensor_id in self.code_ids and snapshot.values[sensor_id] is not None)
+        changes = tuple((sensor_id, value) for sensor_id, value in enumerate(snapshot.values)
+                        if value != old_values[sensor_id] or sensor_id in refreshed)
+        replayed = tuple(change for change in changes if change[0] not in self.code_ids)
+        if replayed:
+            if len(self.entries) >= self.capacity:
+                self.horizon = self.entries.popleft()[0]
+            self.entries.append((snapshot.version, snapshot.timestamp, replayed))
+        return changes
+
+    def since(self, seq: int) -> Optional[list]:
+        """
+        Dernier changement de chaque capteur publié après la séquence seq
+        (lecture sans verrou): les valeurs intermédiaires sont inutiles au
+        client qui rattrape son retard
+        Returns: [(version, horodatage, ((sensor_id, valeur),)), ...] par
+                 version croissante, ou None si l'historique ne remonte plus
+                 jusqu'à seq (instantané complet nécessaire)
+        """
+        entries = tuple(self.entries)
+        if seq < self.horizon or seq > current_snapshot.version:
+            # Historique évincé, ou séquence d'un serveur redémarré depuis
+            return None
+        latest = {}
+        for version, timestamp, changes in entries:
+            if version > seq:
+                for sensor_id, value in changes:
+                    latest[sensor_id] = (version, timestamp, ((sensor_id, value),))
+        return sorted(latest.values(), key=lambda entry: entry[0])
+
+# Nombre de deltas conservés pour la reprise après reconnexion ('resume <seq>')
+REPLAY_BUFFER_SIZE = int(os.environ.get('MEDISENSE_REPLAY_SIZE', '1024'))
+replay_buffer = ReplayBuffer(REPLAY_BUFFER_SIZE)
+
+class SensorHistory:
+    """
+    Historique circulaire à capacité fixe d'un capteur: horodatages
+    monotones et valeurs dans deux tableaux de doubles préalloués (mémoire
+    constante, ajout en O(1) sans allocation).
+    Les lecteurs ne prennent pas de verrou: ils relisent le compteur
+    d'écritures après copie et recommencent si un écrivain a pu écraser la
+    fenêtre lue.
+    """
+    __slots__ = ('capacity', 'timestamps', 'values', 'count', 'lock')
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.timestamps = array('d', bytes(8 * capacity))
+        self.values = array('d', bytes(8 * capacity))
+        # Nombre total d'écritures (position d'écriture = count % capacity)
+        self.count = 0
+        # Sérialise les écrivains (plusieurs ports peuvent fournir un capteur)
+        self.lock = threading.Lock()
+
+    def append(self, timestamp: float, value: float):
+        with self.lock:
+            index = self.count % self.capacity
+            self.timestamps[index] = timestamp
+            self.values[index] = value
+            # Publication après écriture des données
+            self.count += 1
+
+    def last(self, n: int) -> list:
+        """
+        Retourne les n dernières lectures, de la plus ancienne à la plus
+        récente, sans copier le reste du tableau
+        Returns: [(horodatage monotone, valeur), ...] (au plus capacity - 1)
+        """
+        capacity = self.capacity
+        while True:
+            end = self.count
+            start = end - min(n, end, capacity - 1)
+            first, stop = start % capacity, end % capacity
+            if first <= stop:
+                timestamps = self.timestamps[first:stop]
+                values = self.values[first:stop]
+            else:
+                timestamps = self.timestamps[first:] + self.timestamps[:stop]
+                values = self.values[first:] + self.values[:stop]
+            # L'écriture en cours (index count) ne doit pas avoir atteint la fenêtre
+            if self.count < start + capacity:
+                return list(zip(timestamps, values))
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+# Nombre de lectures conservées par capteur ('get-history <capteur> <n>')
+HISTORY_SIZE = int(os.environ.get('MEDISENSE_HISTORY_SIZE', '4096'))
+sensor_history = tuple(SensorHistory(HISTORY_SIZE) for _ in SENSOR_REGISTRY)
+
+class RollupTier:
+    """
+    Agrégats (nombre, min, max, somme) par intervalle de temps fixe, dans des
+    tableaux circulaires préalloués: chaque emplacement porte le numéro
+    d'intervalle (epoch) qu'il agrège et est réinitialisé à sa réutilisation
+    """
+    __slots__ = ('resolution', 'slots', 'epochs', 'counts', 'minimums', 'maximums', 'sums')
+
+    def __init__(self, resolution: int, slots: int):
+        self.resolution = resolution
+        self.slots = slots
+        self.epochs = array('q', [-1]) * slots
+        self.counts = array('q', bytes(8 * slots))
+        self.minimums = array('d', bytes(8 * slots))
+        self.maximums = array('d', bytes(8 * slots))
+        self.sums = array('d', bytes(8 * slots))
+
+    def add(self, timestamp: float, value: float):
+        """Ajoute une lecture en O(1) (appelé sous le verrou des écrivains)"""
+        epoch = int(timestamp // self.resolution)
+        index = epoch % self.slots
+        if self.epochs[index] != epoch:
+            self.epochs[index] = -1
+            self.counts[index] = 1
+            self.minimums[index] = self.maximums[index] = self.sums[index] = value
+            self.epochs[index] = epoch
+            return
+        self.counts[index] += 1
+        self.sums[index] += value
+        if value < self.minimums[index]:
+            self.minimums[index] = value
+        if value > self.maximums[index]:
+            self.maximums[index] = value
+
+    def query(self, span: float, now: float) -> list:
+        """
+        Agrégats des intervalles couvrant les span dernières secondes (lecture
+        sans verrou: un emplacement réutilisé pendant la lecture est ignoré)
+        Returns: [(début d'intervalle, nombre, min, max, moyenne), ...]
+        """
+        last = int(now // self.resolution)
+        # Arrondi supérieur: un span non multiple de la résolution inclut
+        # l'intervalle partiellement couvert (au moins un intervalle)
+        wanted = max(1, int(-(-span // self.resolution)))
+        first = max(last - wanted + 1, last - self.slots + 1)
+        buckets = []
+        for epoch in range(first, last + 1):
+            index = epoch % self.slots
+            if self.epochs[index] != epoch:
+                continue
+            count, minimum, maximum, total = (self.counts[index], self.minimums[index],
+                                              self.maximums[index], self.sums[index])
+            if self.epochs[index] == epoch and count:
+                buckets.append((epoch * self.resolution, count, minimum, maximum, total / count))
+        return buckets
+
+# Niveaux d'agrégation: nom -> (résolution en secondes, emplacements)
+# 1s sur 1 heure, 1m sur 1 jour, 1h sur 30 jours
+ROLLUP_TIERS = {'1s': (1, 3600), '1m': (60, 1440), '1h': (3600, 720)}
+
+class SensorRollups:
+    """Agrégats multi-résolution d'un capteur, tenus à jour à chaque lecture"""
+    __slots__ = ('tiers', 'lock')
+
+    def __init__(self):
+        self.tiers = {name: RollupTier(resolution, slots) for name, (resolution, slots) in ROLLUP_TIERS.items()}
+        self.lock = threading.Lock()
+
+    def add(self, timestamp: float, value: float):
+        with self.lock:
+            for tier in self.tiers.values():
+                tier.add(timestamp, value)
+
+# Agrégats des capteurs de mesure (pas des codes de validation)
+sensor_rollups = tuple(None if spec.is_code else SensorRollups() for spec in SENSOR_REGISTRY)
+
+class BitWriter:
+    """Écriture de champs de bits (poids fort d'abord) dans un bytearray"""
+    __slots__ = ('data', 'accumulator', 'pending')
+
+    def __init__(self):
+        self.data = bytearray()
+        self.accumulator = 0
+        self.pending = 0
+
+    def write(self, value: int, width: int):
+        self.accumulator = (self.accumulator << width) | (value & ((1 << width) - 1))
+        self.pending += width
+        if self.pending >= 64:
+            # Vidage des octets complets
+            size, self.pending = divmod(self.pending, 8)
+            self.data += (self.accumulator >> self.pending).to_bytes(size, 'big')
+            self.accumulator &= (1 << self.pending) - 1
+
+    def getvalue(self) -> bytes:
+        """Contenu écrit, complété par des bits nuls jusqu'à l'octet"""
+        padding = -self.pending % 8
+        return bytes(self.data) + (self.accumulator << padding).to_bytes((self.pending + padding) // 8, 'big')
+
+class BitReader:
+    """
+    Lecture de champs de bits (poids fort d'abord), sur la représentation
+    binaire textuelle du bloc: coût de lecture indépendant de sa taille
+    """
+    __slots__ = ('bits', 'position')
+
+    def __init__(self, data: bytes):
+        self.bits = format(int.from_bytes(data, 'big'), f'0{len(data) * 8}b') if data else ''
+        self.position = 0
+
+    def read(self, width: int) -> int:
+        position = self.position
+        self.position = position + width
+        return int(self.bits[position:position + width], 2)
+
+    def bit(self) -> bool:
+        position = self.position
+        self.position = position + 1
+        return self.bits[position] == '1'
+
+# Codage des deltas de deltas d'horodatage: (préfixe, bits du préfixe, bits de la valeur)
+GORILLA_DOD_CLASSES = ((0b10, 2, 7), (0b110, 3, 9), (0b1110, 4, 12), (0b1111, 4, 64))
+
+class GorillaEncoder:
+    """
+    Encodage compressé d'une suite (horodatage ms, valeur) à la Gorilla:
+    delta de delta des horodatages, XOR des valeurs avec la précédente
+    (seuls les bits significatifs sont écrits)
+    """
+    __slots__ = ('writer', 'count', 'first_timestamp', 'last_timestamp', 'last_delta',
+                 'last_bits', 'leading', 'trailing')
+
+    def __init__(self):
+        self.writer = BitWriter()
+        self.count = 0
+        self.first_timestamp = self.last_timestamp = 0
+        self.last_delta = 0
+        self.last_bits = 0
+        self.leading = self.trailing = -1
+
+    def append(self, timestamp: int, value: float):
+        writer = self.writer
+        bits = struct.unpack('<Q', struct.pack('<d', value))[0]
+        
+        if not self.count:
+            writer.write(timestamp, 64)
+            writer.write(bits, 64)
+            self.first_timestamp = self.last_timestamp = timestamp
+            self.last_bits = bits
+            self.count = 1
+            return
+        
+        # Horodatage: delta de delta (0 pour un capteur à cadence fixe)
+        delta = timestamp - self.last_timestamp
+        dod = delta - self.last_delta
+        if dod == 0:
+            writer.write(0, 1)
+        else:
+            for prefix, prefix_width, width in GORILLA_DOD_CLASSES:
+                if -(1 << (width - 1)) < dod <= (1 << (width - 1)) or width == 64:
+                    writer.write(prefix, prefix_width)
+                    writer.write(dod, width)
+                    break
+        self.last_timestamp = timestamp
+        self.last_delta = delta
+        
+        # Valeur: XOR avec la précédente (0 pour une valeur inchangée)
+        xor = bits ^ self.last_bits
+        self.last_bits = bits
+        if xor == 0:
+            writer.write(0, 1)
+        else:
+            leading = min(64 - xor.bit_length(), 31)
+            trailing = (xor & -xor).bit_length() - 1
+            if self.leading >= 0 and leading >= self.leading and trailing >= self.trailing:
+                # Bits significatifs dans la fenêtre précédente
+                writer.write(0b10, 2)
+                writer.write(xor >> self.trailing, 64 - self.leading - self.trailing)
+            else:
+                significant = 64 - leading - trailing
+                writer.write(0b11, 2)
+                writer.write(leading, 5)
+                writer.write(significant & 63, 6)  # 64 codé 0
+                writer.write(xor >> trailing, significant)
+                self.leading, self.trailing = leading, trailing
+        self.count += 1
+
+    def getvalue(self) -> bytes:
+        return self.writer.getvalue()
+
+def gorilla_decode(data: bytes, count: int):
+    """Décode paresseusement un bloc Gorilla: génère (horodatage ms, valeur)"""
+    if not count:
+        return
+    reader = BitReader(data)
+    unpack_bits = struct.Struct('<Q').pack
+    unpack_value = struct.Struct('<d').unpack
+    
+    timestamp = reader.read(64)
+    bits = reader.read(64)
+    yield timestamp, unpack_value(unpack_bits(bits))[0]
+    
+    delta = 0
+    leading = trailing = 0
+    for _ in range(count - 1):
+        if reader.bit():
+            for prefix, prefix_width, width in GORILLA_DOD_CLASSES:
+                if width == 64 or not reader.bit():
+                    dod = reader.read(width)
+                    if dod > (1 << (width - 1)):
+                        dod -= 1 << width
+                    delta += dod
+                    break
+        timestamp += delta
+        
+        if reader.bit():
+            if reader.bit():
+                leading = reader.read(5)
+                significant = reader.read(6) or 64
+                trailing = 64 - leading - significant
+            bits ^= reader.read(64 - leading - trailing) << trailing
+        yield timestamp, unpack_value(unpack_bits(bits))[0]
+
+class GorillaBlock:
+    """Bloc scellé (immuable) de lectures compressées"""
+    __slots__ = ('data', 'count', 'first_timestamp', 'last_timestamp')
+
+    def __init__(self, data: bytes, count: int, first_timestamp: int, last_timestamp: int):
+        self.data = data
+        self.count = count
+        self.first_timestamp = first_timestamp
+        self.last_timestamp = last_timestamp
+
+    def __iter__(self):
+        return gorilla_decode(self.data, self.count)
+
+class CompressedHistory:
+    """
+    Historique longue durée compressé d'un capteur: un bloc ouvert en cours
+    d'encodage et des blocs scellés de block_size lectures, les plus anciens
+    étant abandonnés au-delà de max_blocks (mémoire bornée)
+    """
+
+    def __init__(self, block_size: int, max_blocks: int):
+        self.block_size = block_size
+        self.blocks = deque(maxlen=max_blocks)
+        self.encoder = GorillaEncoder()
+        self.lock = threading.Lock()
+
+    def append(self, timestamp: int, value: float):
+        """Ajoute une lecture (horodatage en millisecondes epoch)"""
+        with self.lock:
+            encoder = self.encoder
+            encoder.append(timestamp, value)
+            if encoder.count >= self.block_size:
+                self.blocks.append(GorillaBlock(encoder.getvalue(), encoder.count,
+                                                encoder.first_timestamp, encoder.last_timestamp))
+                self.encoder = GorillaEncoder()
+
+    def query(self, start: int = 0, end: Optional[int] = None):
+        """
+        Génère les lectures (horodatage ms, valeur) de [start, end] dans
+        l'ordre; seuls les blocs chevauchant l'intervalle sont décodés, au fur
+        et à mesure de la consommation
+        """
+        with self.lock:
+            blocks = list(self.blocks)
+            encoder = self.encoder
+            if encoder.count:
+                blocks.append(GorillaBlock(encoder.getvalue(), encoder.count,
+                                           encoder.first_timestamp, encoder.last_timestamp))
+        for block in blocks:
+            if block.last_timestamp < start or (end is not None and block.first_timestamp > end):
+                continue
+            for timestamp, value in block:
+                if timestamp >= start and (end is None or timestamp <= end):
+                    yield timestamp, value
+
+    def nbytes(self) -> int:
+        """Taille des données compressées (octets)"""
+        with self.lock:
+            return sum(len(block.data) for block in self.blocks) + len(self.encoder.writer.data) + 8
+
+    def __len__(self):
+        return sum(block.count for block in list(self.blocks)) + self.encoder.count
+
+# Historique compressé optionnel (MEDISENSE_COMPRESSED_HISTORY=1): blocs de
+# MEDISENSE_BLOCK_SIZE lectures, MEDISENSE_MAX_BLOCKS blocs par capteur
+COMPRESSED_HISTORY = os.environ.get('MEDISENSE_COMPRESSED_HISTORY', '0') == '1'
+COMPRESSED_BLOCK_SIZE = int(os.environ.get('MEDISENSE_BLOCK_SIZE', '1024'))
+COMPRESSED_MAX_BLOCKS = int(os.environ.get('MEDISENSE_MAX_BLOCKS', '2048'))
+compressed_history = (tuple(CompressedHistory(COMPRESSED_BLOCK_SIZE, COMPRESSED_MAX_BLOCKS) for _ in SENSOR_REGISTRY)
+                      if COMPRESSED_HISTORY else None)
+
+class ReadingStore:
+    """
+    Persistance SQLite des lectures acceptées, hors du chemin de lecture série:
+    les lectures sont déposées dans une file bornée et un thread dédié les
+    insère par transactions groupées (taille ou fenêtre de temps) en mode WAL
+    """
+
+    SCHEMA = ("CREATE TABLE IF NOT EXISTS readings ("
+              "ts REAL NOT NULL, sensor TEXT NOT NULL, value REAL, port TEXT)")
+    INDEX = "CREATE INDEX IF NOT EXISTS readings_sensor_ts ON readings (sensor, ts)"
+    INSERT = "INSERT INTO readings (ts, sensor, value, port) VALUES (?, ?, ?, ?)"
+
+    def __init__(self, path: str, batch_size: int = 500, flush_interval: float = 1.0,
+                 max_pending: int = 100000):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.queue = queue.SimpleQueue()
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.errors = 0
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Démarre le thread d'écriture"""
+        self._thread = threading.Thread(target=self._run, daemon=True, name="ReadingStore")
+        self._thread.start()
+
+    def submit(self, timestamp: float, sensor: str, value, port: str):
+        """Dépose une lecture sans jamais attendre le disque (abandon si la file est pleine)"""
+        if self.queue.qsize() >= self.max_pending:
+            self.dropped += 1
+            return
+        self.queue.put((timestamp, sensor, value, port))
+
+    def stop(self, timeout: float = 5.0):
+        """Écrit les lectures en attente puis arrête le thread"""
+        if self._thread is not None:
+            self.queue.put(None)
+            self._thread.join(timeout)
+            self._thread = None
+
+    @staticmethod
+    def connect(path: str) -> sqlite3.Connection:
+        """Ouvre la base (mode WAL, table des lectures créée si besoin)"""
+        connection = sqlite3.connect(path)
+        connection.execute("PRAGMA journal_mode=WAL")
+        # En WAL, NORMAL ne synchronise qu'aux points de contrôle
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute(ReadingStore.SCHEMA)
+        connection.execute(ReadingStore.INDEX)
+        connection.commit()
+        return connection
+
+    def _run(self):
+        connection = self.connect(self.path)
+        logger.info(f"💾 Persistance des lectures dans {self.path} (WAL)")
+        running = True
+        try:
+            while running:
+                # Attente de la première lecture, puis regroupement
+                item = self.queue.get()
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+                while item is not None:
+                    batch.append(item)
+                    if len(batch) >= self.batch_size:
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = self.queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                running = item is not None
+                if batch:
+                    self._write(connection, batch)
+        finally:
+            connection.close()
+
+    def _write(self, connection: sqlite3.Connection, batch: list):
+        try:
+            with connection:
+                connection.executemany(self.INSERT, batch)
+            self.written += len(batch)
+            self.batches += 1
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.error(f"❌ Persistance: {len(batch)} lectures non écrites: {e}")
+
+    def summary(self) -> str:
+        return (f"written={self.written},batches={self.batches},pending={self.queue.qsize()},"
+                f"dropped={self.dropped},errors={self.errors}")
+
+# Base SQLite des lectures (MEDISENSE_DB=chemin pour l'activer)
+READINGS_DB = os.environ.get('MEDISENSE_DB')
+reading_store: Optional[ReadingStore] = None
+
+def start_reading_store():
+    """Démarre la persistance si une base est configurée"""
+    global reading_store
+    if READINGS_DB and reading_store is None:
+        reading_store = ReadingStore(READINGS_DB)
+        reading_store.start()
+
+def stop_reading_store():
+    """Écrit les dernières lectures et arrête la persistance"""
+    global reading_store
+    if reading_store is not None:
+        reading_store.stop()
+        logger.info(f"💾 Persistance arrêtée ({reading_store.summary()})")
+        reading_store = None
+
+# Enregistrement du journal (32 octets, petit-boutiste): séquence (u64),
+# horodatage (f64), sensor_id (u8), port_id (u16), valeur (f64, NaN si
+# absente), puis CRC32 des 28 premiers octets
+JOURNAL_RECORD = struct.Struct('<QdBxHd')
+JOURNAL_CRC = struct.Struct('<I')
+JOURNAL_RECORD_SIZE = JOURNAL_RECORD.size + JOURNAL_CRC.size
+
+class JournalSegment:
+    """Fichier de journal préalloué et projeté en mémoire (mmap)"""
+    __slots__ = ('path', 'file', 'map', 'view', 'capacity', 'count')
+
+    def __init__(self, path: str, size: int):
+        self.path = path
+        self.file = open(path, 'a+b')
+        if os.fstat(self.file.fileno()).st_size < size:
+            self.file.truncate(size)
+        self.map = mmap.mmap(self.file.fileno(), 0)
+        self.view = memoryview(self.map)
+        self.capacity = len(self.map) // JOURNAL_RECORD_SIZE
+        self.count = self._find_end()
+
+    def valid(self, index: int) -> bool:
+        """Vrai si l'enregistrement index est écrit et intègre (CRC)"""
+        offset = index * JOURNAL_RECORD_SIZE
+        end = offset + JOURNAL_RECORD.size
+        return zlib.crc32(self.view[offset:end]) == JOURNAL_CRC.unpack_from(self.map, end)[0]
+
+    def _find_end(self) -> int:
+        """
+        Nombre d'enregistrements écrits: recherche dichotomique de la zone
+        vide (séquence nulle), puis recul sur un éventuel enregistrement
+        tronqué par un arrêt brutal
+        """
+        low, high = 0, self.capacity
+        while low < high:
+            middle = (low + high) // 2
+            if JOURNAL_RECORD.unpack_from(self.map, middle * JOURNAL_RECORD_SIZE)[0]:
+                low = middle + 1
+            else:
+                high = middle
+        while low and not self.valid(low - 1):
+            low -= 1
+        return low
+
+    def append(self, record: bytes) -> bool:
+        """Ajoute un enregistrement; False si le segment est plein"""
+        if self.count >= self.capacity:
+            return False
+        offset = self.count * JOURNAL_RECORD_SIZE
+        self.map[offset:offset + JOURNAL_RECORD_SIZE] = record
+        self.count += 1
+        return True
+
+    def find(self, seq: int) -> int:
+        """Rang du premier enregistrement de séquence >= seq (séquences croissantes)"""
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if JOURNAL_RECORD.unpack_from(self.map, middle * JOURNAL_RECORD_SIZE)[0] < seq:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def records(self, start: int = 0, stop: Optional[int] = None):
+        """Génère les enregistrements intègres (lecture sans copie dans le mmap)"""
+        for index in range(start, self.count if stop is None else stop):
+            if self.valid(index):
+                yield JOURNAL_RECORD.unpack_from(self.map, index * JOURNAL_RECORD_SIZE)
+
+    def close(self):
+        self.view.release()
+        self.map.flush()
+        self.map.close()
+        self.file.close()
+
+class ReadingJournal:
+    """
+    Journal binaire des lectures acceptées, en ajout seul: segments de taille
+    fixe projetés en mémoire ('journal-<première séquence>.bin'), rotation
+    par taille (les plus anciens sont supprimés au-delà de max_segments).
+    Chaque enregistrement porte un CRC: un arrêt brutal ne perd au plus que
+    l'enregistrement en cours d'écriture.
+    """
+
+    def __init__(self, directory: str, segment_size: int = 4 * 1024 * 1024, max_segments: int = 16):
+        self.directory = directory
+        self.segment_size = segment_size - segment_size % JOURNAL_RECORD_SIZE
+        self.max_segments = max_segments
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        # Noms des ports (port_id = rang + 1, 0 = sans port)
+        self.ports_path = os.path.join(directory, 'ports.txt')
+        self.ports: Dict[str, int] = {}
+        if os.path.exists(self.ports_path):
+            with open(self.ports_path, encoding='utf-8') as ports_file:
+                for line in ports_file:
+                    self.ports[line.rstrip('\n')] = len(self.ports) + 1
+        paths = self.segment_paths()
+        self.segment = JournalSegment(paths[-1], self.segment_size) if paths else None
+
+    def segment_paths(self) -> list:
+        """Segments existants, du plus ancien au plus récent"""
+        return sorted(glob.glob(os.path.join(self.directory, 'journal-*.bin')))
+
+    def port_id(self, port_name: str) -> int:
+        if not port_name:
+            return 0
+        port_id = self.ports.get(port_name)
+        if port_id is None:
+            port_id = self.ports[port_name] = len(self.ports) + 1
+            with open(self.ports_path, 'a', encoding='utf-8') as ports_file:
+                ports_file.write(port_name + '\n')
+        return port_id
+
+    def append(self, seq: int, timestamp: float, sensor_id: int, value, port_name: str = ''):
+        """Ajoute une lecture (séquence > 0)"""
+        with self.lock:
+            record = JOURNAL_RECORD.pack(seq, timestamp, sensor_id, self.port_id(port_name),
+                                         float('nan') if value is None else value)
+            record += JOURNAL_CRC.pack(zlib.crc32(record))
+            if self.segment is None or not self.segment.append(record):
+                self._rotate(seq)
+                self.segment.append(record)
+
+    def _rotate(self, seq: int):
+        if self.segment is not None:
+            self.segment.close()
+        path = os.path.join(self.directory, f"journal-{seq:020d}.bin")
+        self.segment = JournalSegment(path, self.segment_size)
+        for old_path in self.segment_paths()[:-self.max_segments]:
+            os.remove(old_path)
+
+    def flush(self):
+        """Force l'écriture des pages modifiées sur le support"""
+        with self.lock:
+            if self.segment is not None:
+                self.segment.map.flush()
+
+    def close(self):
+        with self.lock:
+            if self.segment is not None:
+                self.segment.close()
+                self.segment = None
+
+    def scan(self, start_seq: int = 0):
+        """
+        Génère les enregistrements (seq, ts, sensor_id, port_id, valeur) de
+        séquence >= start_seq, segment par segment, sans copie des fichiers
+        """
+        paths = self.segment_paths()
+        for index, path in enumerate(paths):
+            if index + 1 < len(paths) and int(os.path.basename(paths[index + 1])[8:-4]) <= start_seq:
+                continue
+            segment = JournalSegment(path, 0)
+            try:
+                yield from segment.records(segment.find(start_seq))
+            finally:
+                segment.close()
+
+    def recover(self):
+        """
+        État au moment de l'arrêt, lu depuis la fin du journal
+        Returns: (dernière séquence, horodatage, {sensor_id: valeur})
+        """
+        values: Dict[int, Any] = {}
+        last_seq, last_timestamp = 0, 0.0
+        for path in reversed(self.segment_paths()):
+            segment = self.segment if self.segment is not None and self.segment.path == path else JournalSegment(path, 0)
+            try:
+                for index in range(segment.count - 1, -1, -1):
+                    if not segment.valid(index):
+                        continue
+                    seq, timestamp, sensor_id, _, value = JOURNAL_RECORD.unpack_from(segment.map, index * JOURNAL_RECORD_SIZE)
+                    if not last_seq:
+                        last_seq, last_timestamp = seq, timestamp
+                    if sensor_id < len(SENSOR_REGISTRY) and sensor_id not in values:
+                        values[sensor_id] = None if value != value else value
+                        if len(values) == len(SENSOR_REGISTRY):
+                            return last_seq, last_timestamp, values
+            finally:
+                if segment is not self.segment:
+                    segment.close()
+        return last_seq, last_timestamp, values
+
+# Journal binaire des lectures (MEDISENSE_JOURNAL_DIR=répertoire pour l'activer)
+JOURNAL_DIR = os.environ.get('MEDISENSE_JOURNAL_DIR')
+JOURNAL_SEGMENT_SIZE = int(os.environ.get('MEDISENSE_JOURNAL_SEGMENT_SIZE', str(4 * 1024 * 1024)))
+reading_journal: Optional[ReadingJournal] = None
+
+def open_reading_journal():
+    """Ouvre le journal des lectures s'il est configuré"""
+    global reading_journal
+    if JOURNAL_DIR and reading_journal is None:
+        reading_journal = ReadingJournal(JOURNAL_DIR, JOURNAL_SEGMENT_SIZE)
+
+def close_reading_journal():
+    global reading_journal
+    if reading_journal is not None:
+        reading_journal.close()
+        reading_journal = None
+
+# Ports et capteurs qu'ils fournissent: port -> {'sensor', 'port_path', 'baudrate'}
+# (restauré au démarrage, exposé par 'get-state')
+port_map: Dict[str, Dict[str, Any]] = {}
+
+def note_port_sensor(port_name: str, conn_info: Dict[str, Any], sensor_type: str):
+    """Associe un port au capteur dont il vient de fournir une lecture"""
+    spec = SENSOR_REGISTRY.resolve(sensor_type)
+    if spec is None or conn_info.get('sensor') == spec.name:
+        return
+    conn_info['sensor'] = spec.name
+    port_map[port_name] = {'sensor': spec.name, 'port_path': conn_info.get('port_path'),
+                           'baudrate': conn_info.get('baudrate')}
+    if conn_info.get('baudrate'):
+        remember_port_identity(conn_info, spec.name)
+
+# Instantané d'état (valeurs et ports) écrit périodiquement pour un
+# redémarrage rapide: MEDISENSE_STATE_FILE, par défaut dans le répertoire du journal
+STATE_FILE = os.environ.get('MEDISENSE_STATE_FILE') or (os.path.join(JOURNAL_DIR, 'state.json') if JOURNAL_DIR else None)
+STATE_INTERVAL = float(os.environ.get('MEDISENSE_STATE_INTERVAL', '5'))
+
+# Heure murale de la restauration au démarrage (0 si aucun état restauré)
+restored_at = 0.0
+
+# Vrai pendant le mode simulation: ses valeurs fictives ne sont ni
+# journalisées ni conservées dans l'instantané d'état
+simulation_active = False
+
+def save_state_snapshot(path: str, last_saved: Optional[tuple] = None) -> tuple:
+    """
+    Écrit atomiquement l'état courant (fichier temporaire puis renommage),
+    sauf s'il n'a pas changé depuis la dernière écriture
+    Args:
+        path - Fichier d'état
+        last_saved - Valeur retournée par l'appel précédent
+    Returns: Marqueur de l'état écrit (version, ports)
+    """
+    if simulation_active:
+        return last_saved
+    snapshot = current_snapshot
+    ports = {port: dict(info) for port, info in list(port_map.items())}
+    marker = (snapshot.version, tuple(sorted((port, info['sensor']) for port, info in ports.items())))
+    if marker == last_saved:
+        return marker
+    
+    state = {
+        "version": snapshot.version,
+        "timestamp": snapshot.timestamp,
+        "saved_at": time.time(),
+        # Les codes de validation, à usage unique, ne sont pas conservés
+        "values": {spec.name: snapshot[spec.sensor_id] for spec in SENSOR_REGISTRY if not spec.is_code},
+        "ports": ports,
+    }
+    temporary = f"{path}.tmp"
+    with open(temporary, 'w', encoding='utf-8') as state_file:
+        json.dump(state, state_file, separators=(',', ':'))
+        state_file.flush()
+        os.fsync(state_file.fileno())
+    os.replace(temporary, path)
+    return marker
+
+def state_snapshot_loop():
+    """Thread d'écriture périodique de l'instantané d'état"""
+    last_saved = None
+    while True:
+        stopping = shutdown_event.wait(STATE_INTERVAL)
+        try:
+            last_saved = save_state_snapshot(STATE_FILE, last_saved)
+        except OSError as e:
+            logger.error(f"❌ Écriture de l'état {STATE_FILE}: {e}")
+        if stopping:
+            return
+
+def start_state_snapshots():
+    """Démarre l'écriture périodique de l'état si un fichier est configuré"""
+    if STATE_FILE:
+        threading.Thread(target=state_snapshot_loop, daemon=True, name="StateSnapshot").start()
+
+def stop_state_snapshots():
+    """Écrit l'état final à l'arrêt"""
+    if STATE_FILE:
+        try:
+            save_state_snapshot(STATE_FILE)
+        except OSError as e:
+            logger.error(f"❌ Écriture de l'état {STATE_FILE}: {e}")
+
+def load_state_snapshot(path: str) -> Optional[dict]:
+    """Lit l'instantané d'état, ou None s'il est absent ou illisible"""
+    try:
+        with open(path, encoding='utf-8') as state_file:
+            state = json.load(state_file)
+        return state if isinstance(state.get("values"), dict) else None
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, AttributeError) as e:
+        logger.warning(f"⚠️ État {path} illisible, ignoré: {e}")
+        return None
+
+def restore_sensor_state():
+    """
+    Restaure au démarrage les dernières valeurs connues (marquées périmées
+    jusqu'à leur prochaine lecture), la séquence et les ports: instantané
+    d'état puis enregistrements du journal postérieurs, ou fin du journal seule
+    """
+    global current_snapshot, restored_at
+    start = time.perf_counter()
+    values: Dict[int, Any] = {}
+    seq, timestamp = 0, 0.0
+    
+    state = load_state_snapshot(STATE_FILE) if STATE_FILE else None
+    if state is not None:
+        seq, timestamp = int(state.get("version", 0)), float(state.get("timestamp", 0.0))
+        for name, value in state["values"].items():
+            spec = SENSOR_REGISTRY.resolve(name)
+            if spec is not None:
+                values[spec.sensor_id] = value
+        for port, info in state.get("ports", {}).items():
+            if isinstance(info, dict) and SENSOR_REGISTRY.resolve(info.get("sensor", "")) is not None:
+                port_map[port] = info
+    
+    if reading_journal is not None:
+        if state is not None:
+            # Queue du journal écrite après l'instantané
+            for record_seq, record_timestamp, sensor_id, _, value in reading_journal.scan(seq + 1):
+                if sensor_id < len(SENSOR_REGISTRY):
+                    values[sensor_id] = None if value != value else value
+                    seq, timestamp = record_seq, record_timestamp
+        else:
+            seq, timestamp, values = reading_journal.recover()
+    
+    restored = {sensor_id: value for sensor_id, value in values.items()
+                if value is not None and not SENSOR_REGISTRY.specs[sensor_id].is_code}
+    if not seq:
+        return
+    
+    with data_lock:
+        current_values = list(current_snapshot.values)
+        for sensor_id, value in restored.items():
+            current_values[sensor_id] = value
+        current_snapshot = SensorSnapshot(max(seq, current_snapshot.version), tuple(current_values),
+                                          timestamp, frozenset(restored))
+        # Les séquences antérieures ne sont plus dans le tampon de reprise
+        replay_buffer.horizon = current_snapshot.version
+    restored_at = time.time()
+    
+    logger.info(f"📒 État restauré en {(time.perf_counter() - start) * 1000:.1f} ms: séquence {seq}, "
+                f"{dict((SENSOR_REGISTRY.specs[i].name, v) for i, v in restored.items())} (périmées), "
+                f"ports {dict((port, info['sensor']) for port, info in port_map.items())}")
+
+def record_reading(sensor_id: int, value, timestamp: Optional[float] = None, port_name: str = '',
+                   seq: int = 0):
+    """
+    Ajoute une lecture acceptée à l'historique, aux agrégats et à la
+    persistance du capteur
+    Args:
+        sensor_id - Capteur
+        value - Valeur lue
+        timestamp - Heure murale de la lecture (défaut: maintenant)
+        port_name - Port source
+        seq - Séquence (version de l'instantané publié)
+    """
+    sensor_history[sensor_id].append(time.monotonic(), value)
+    if timestamp is None:
+        timestamp = time.time()
+    rollups = sensor_rollups[sensor_id]
+    if rollups is not None:
+        rollups.add(timestamp, value)
+    if compressed_history is not None:
+        compressed_history[sensor_id].append(int(timestamp * 1000), value)
+    store = reading_store
+    if store is not None:
+        store.submit(timestamp, SENSOR_REGISTRY.specs[sensor_id].name, value, port_name)
+    journal = reading_journal
+    if journal is not None and seq:
+        journal.append(seq, timestamp, sensor_id, value, port_name)
+
+def publish_sensor_value(sensor_id: int, value) -> SensorSnapshot:
+    """
+    Publie un nouvel instantané où un capteur prend une nouvelle valeur
+    Returns: Instantané publié
+    """
+    global current_snapshot
+    with data_lock:
+        previous = current_snapshot
+        values = previous.values
+        stale = previous.stale
+        snapshot = SensorSnapshot(previous.version + 1,
+                                  values[:sensor_id] + (value,) + values[sensor_id + 1:],
+                                  stale=stale - {sensor_id} if stale else stale)
+        current_snapshot = snapshot
+        changes = replay_buffer.record(previous, snapshot, (sensor_id,))
+    notify_subscribers(snapshot, changes)
+    return snapshot
+
+def publish_sensor_values(changes: Dict[int, Any]) -> SensorSnapshot:
+    """
+    Publie un nouvel instantané modifiant plusieurs capteurs en une fois
+    Args: changes - {sensor_id: valeur}
+    Returns: Instantané publié
+    """
+    global current_snapshot
+    with data_lock:
+        previous = current_snapshot
+        values = list(previous.values)
+        for sensor_id, value in changes.items():
+            values[sensor_id] = value
+        stale = previous.stale
+        snapshot = SensorSnapshot(previous.version + 1, tuple(values),
+                                  stale=stale.difference(changes) if stale else stale)
+        current_snapshot = snapshot
+        changes = replay_buffer.record(previous, snapshot, changes)
+    notify_subscribers(snapshot, changes)
+    return snapshot
+
+def compare_and_swap_sensor(sensor_id: int, expected, new_value) -> bool:
+    """
+    Remplace atomiquement la valeur d'un capteur si elle vaut encore expected
+    (consommation unique de la validation)
+    Returns: True si l'échange a eu lieu
+    """
+    global current_snapshot
+    with data_lock:
+        previous = current_snapshot
+        values = previous.values
+        if values[sensor_id] != expected:
+            return False
+        stale = previous.stale
+        snapshot = SensorSnapshot(previous.version + 1,
+                                  values[:sensor_id] + (new_value,) + values[sensor_id + 1:],
+                                  stale=stale - {sensor_id} if stale else stale)
+        current_snapshot = snapshot
+        changes = replay_buffer.record(previous, snapshot, (sensor_id,))
+    notify_subscribers(snapshot, changes)
+    return True
+
+def consume_validation(snapshot: SensorSnapshot) -> Optional[int]:
+    """
+    Consomme la validation lue dans un instantané (une seule fois pour tous
+    les clients)
+    Returns: Code de validation consommé, ou None
+    """
+    value = snapshot.values[VALIDATION]
+    if value == refValidateCard and compare_and_swap_sensor(VALIDATION, value, None):
+        return value
+    return None
+
 # Variable pour contrôler l'arrêt propre du programme
 shutdown_event = threading.Event()
 
 # Liste des clients connectés
 connected_clients = set()
 
+# Sessions des clients connectés (file d'envoi par client)
+client_sessions: Dict[Any, 'ClientSession'] = {}
+
+# Taille max de la file d'envoi d'un client (mises à jour et réponses)
+CLIENT_QUEUE_SIZE = 64
+
+# Formats de protocole négociables à la connexion (sous-protocole WebSocket
+# 'medisense.<format>' ou commande 'hello <format>'); texte par défaut
+PROTOCOL_TEXT, PROTOCOL_JSON, PROTOCOL_BINARY = 'text', 'json', 'bin'
+PROTOCOLS = (PROTOCOL_TEXT, PROTOCOL_JSON, PROTOCOL_BINARY)
+SUBPROTOCOLS = {f"medisense.{protocol}": protocol for protocol in PROTOCOLS}
+
+# Clients abonnés aux mises à jour poussées (commande 'subscribe'):
+# session -> capteurs suivis, et groupes de sessions par (capteur, format)
+# pour n'encoder qu'un message par groupe
+subscribers: Dict[Any, frozenset] = {}
+subscription_groups: Dict[tuple, set] = {(spec.sensor_id, protocol): set()
+                                         for spec in SENSOR_REGISTRY for protocol in PROTOCOLS}
+
+# Boucle asyncio du serveur WebSocket (pour y poster les mises à jour)
+websocket_loop: Optional[asyncio.AbstractEventLoop] = None
+
 # Dictionnaire des ports actifs
 active_ports: Dict[str, serial.Serial] = {}
 
-def discover_serial_ports():
+# Mode de lecture série: 'select' (réveil uniquement à l'arrivée de données)
+# ou 'poll' (ancienne boucle avec pause adaptative)
+SERIAL_READER_MODE = os.environ.get('MEDISENSE_READER_MODE', 'select')
+
+# Délai max d'attente du sélecteur (vérification arrêt / ports à reconnecter)
+SELECT_TIMEOUT = 1.0
+
+# Longueur max d'une ligne sans fin de ligne (au-delà: données parasites)
+MAX_LINE_LENGTH = 4096
+
+# Modèle d'exécution: 'threads' (thread série + thread WebSocket) ou 'asyncio'
+# (ports série et serveur WebSocket sur une seule boucle asyncio, sans verrou)
+RUNTIME_MODE = os.environ.get('MEDISENSE_RUNTIME', 'threads')
+
+class SerialPortInfo(NamedTuple):
+    """Métadonnées d'un port série lues dans sysfs (sans l'ouvrir)"""
+    device: str
+    name: str
+    driver: Optional[str] = None
+    subsystem: Optional[str] = None
+    vid: Optional[str] = None
+    pid: Optional[str] = None
+    serial_number: Optional[str] = None
+    manufacturer: Optional[str] = None
+    product: Optional[str] = None
+    # Topologie USB (bus-ports:configuration.interface, ex: '1-1.2:1.0')
+    location: Optional[str] = None
+
+# Familles de ports série scannées (nom du nœud tty)
+SERIAL_PORT_PREFIXES = ('ttyUSB', 'ttyACM', 'ttyS', 'ttyAMA')
+
+# Racine sysfs des périphériques tty
+SYSFS_TTY_ROOT = '/sys/class/tty'
+
+# Ports connus par la dernière découverte: chemin -> métadonnées
+serial_port_info: Dict[str, SerialPortInfo] = {}
+
+def read_sysfs_attribute(directory: str, name: str) -> Optional[str]:
+    try:
+        with open(os.path.join(directory, name), encoding='utf-8', errors='replace') as attribute:
+            return attribute.read().strip()
+    except OSError:
+        return None
+
+def read_tty_sysfs(name: str, sysfs_root: str = SYSFS_TTY_ROOT, dev_root: str = '/dev') -> Optional[SerialPortInfo]:
     """
-    Découvre automatiquement tous les ports série disponibles
-    Returns: Liste des ports série détectés
+    Lit les métadonnées sysfs d'un tty
+    Returns: Informations du port, ou None s'il n'a pas de matériel
+             (tty virtuel, port 8250 non câblé: type 0)
     """
-    logger.info("🔍 Découverte automatique des ports série...")
+    entry = os.path.join(sysfs_root, name)
+    device = os.path.join(entry, 'device')
+    if not os.path.exists(device):
+        return None
     
-    # Types de ports à scanner
-    port_patterns = [
-        '/dev/ttyUSB*',
-        '/dev/ttyACM*', 
-        '/dev/ttyS*',
-        '/dev/ttyAMA*'
-    ]
+    device_path = os.path.realpath(device)
+    driver_path = os.path.join(device, 'driver')
+    driver = os.path.basename(os.path.realpath(driver_path)) if os.path.exists(driver_path) else None
+    subsystem = os.path.basename(os.path.realpath(os.path.join(device, 'subsystem')))
     
-    available_ports = []
+    if name.startswith('ttyS') and read_sysfs_attribute(entry, 'type') in (None, '0'):
+        # Port série « legacy » déclaré sans UART derrière
+        return None
     
-    for pattern in port_patterns:
-        ports = glob.glob(pattern)
-        available_ports.extend(sorted(ports))
+    info = {}
+    # Remonter jusqu'au périphérique USB (ttyUSB: interface/ttyUSBn, ttyACM: interface)
+    if subsystem in ('usb', 'usb-serial'):
+        directory = device_path if subsystem == 'usb' else os.path.dirname(device_path)
+        info['location'] = os.path.basename(directory)
+        usb_device = os.path.dirname(directory)
+        if read_sysfs_attribute(usb_device, 'idVendor') is not None:
+            info.update(vid=read_sysfs_attribute(usb_device, 'idVendor'),
+                        pid=read_sysfs_attribute(usb_device, 'idProduct'),
+                        serial_number=read_sysfs_attribute(usb_device, 'serial'),
+                        manufacturer=read_sysfs_attribute(usb_device, 'manufacturer'),
+                        product=read_sysfs_attribute(usb_device, 'product'))
     
-    # Filtrer les ports système non utilisables
-    filtered_ports = []
-    for port in available_ports:
-        try:
-            # Test rapide d'ouverture
-            test_ser = serial.Serial(port, 9600, timeout=0.1)
-            test_ser.close()
-            filtered_ports.append(port)
-            logger.info(f"📡 Port détecté: {port}")
-        except (serial.SerialException, PermissionError) as e:
-            logger.debug(f"⚠️ Port {port} non accessible: {e}")
+    return SerialPortInfo(os.path.join(dev_root, name), name, driver, subsystem, **info)
+
+def probe_serial_port(device: str) -> bool:
+    """Test rapide d'ouverture d'un port (9600 baud)"""
+    try:
+        test_ser = serial.Serial(device, 9600, timeout=0.1)
+        test_ser.close()
+        return True
+    except (serial.SerialException, PermissionError, OSError) as e:
+        logger.debug(f"⚠️ Port {device} non accessible: {e}")
+        return False
+
+def is_serial_port_name(name: str) -> bool:
+    """Nom de nœud d'une famille scannée (ex: 'ttyUSB0')"""
+    return any(name.startswith(prefix) and name[len(prefix):].isdigit() for prefix in SERIAL_PORT_PREFIXES)
+
+def list_serial_candidates(sysfs_root: str = SYSFS_TTY_ROOT, dev_root: str = '/dev') -> list:
+    """
+    Ports candidats d'après sysfs, sans ouvrir aucun port (à défaut de sysfs:
+    tous les nœuds /dev correspondant aux familles scannées)
+    Returns: Liste de SerialPortInfo triée (USB et ACM d'abord)
+    """
+    try:
+        names = os.listdir(sysfs_root)
+    except OSError:
+        names = None
     
-    logger.info(f"✅ {len(filtered_ports)} port(s) série utilisable(s) trouvé(s)")
-    return filtered_ports
+    if names is None:
+        return [SerialPortInfo(path, os.path.basename(path))
+                for prefix in SERIAL_PORT_PREFIXES
+                for path in sorted(glob.glob(os.path.join(dev_root, prefix + '*')))]
+    
+    candidates = []
+    for prefix in SERIAL_PORT_PREFIXES:
+        for name in sorted(n for n in names if n.startswith(prefix) and is_serial_port_name(n)):
+            info = read_tty_sysfs(name, sysfs_root, dev_root)
+            if info is None:
+                logger.debug(f"⏭️ {name} ignoré (pas de matériel)")
+            elif os.path.exists(info.device):
+                candidates.append(info)
+    return candidates
 
-def connect_to_ports(ports_list):
+# Nombre max d'ouvertures de test simultanées
+DISCOVERY_WORKERS = int(os.environ.get('MEDISENSE_DISCOVERY_WORKERS', '8'))
+
+def discover_serial_ports(sysfs_root: str = SYSFS_TTY_ROOT, dev_root: str = '/dev'):
     """
-    Établit les connexions avec tous les ports disponibles
-    Args: ports_list - Liste des ports à connecter
-    Returns: Dictionnaire des connexions établies
+    Découvre automatiquement tous les ports série disponibles: filtrage par
+    les métadonnées sysfs, puis tests d'ouverture en parallèle
+    Returns: Liste des ports série détectés
     """
-    logger.info("🔌 Connexion aux ports série...")
+    logger.info("🔍 Découverte automatique des ports série...")
     
-    connections = {}
+    candidates = list_serial_candidates(sysfs_root, dev_root)
+    if not candidates:
+        logger.info("✅ 0 port(s) série utilisable(s) trouvé(s)")
+        return []
     
-    # Baudrates courants à tester
-    baudrates = [9600, 57600, 115200, 38400, 19200]
+    with ThreadPoolExecutor(max_workers=min(DISCOVERY_WORKERS, len(candidates)),
+                            thread_name_prefix="PortProbe") as executor:
+        usable = list(executor.map(lambda info: probe_serial_port(info.device), candidates))
     
-    for port in ports_list:
-        port_name = port.split('/')[-1]  # Extraire le nom du port
-        
-        for baudrate in baudrates:
-            try:
-                ser = serial.Serial(port, baudrate, timeout=1)
-                connections[port_name] = {
-                    'serial': ser,
-                    'port_path': port,
-                    'baudrate': baudrate,
-                    'last_data': None,
-                    'error_count': 0
-                }
-                logger.info(f"✅ {port_name} connecté à {baudrate} baud")
-                break  # Connexion réussie, arrêter les tests de baudrate
-                
-            except serial.SerialException as e:
-                logger.debug(f"❌ Échec connexion {port} @ {baudrate}: {e}")
-                continue
-        
-        if port_name not in connections:
-            logger.warning(f"⚠️ Impossible de connecter {port}")
+    filtered_ports = []
+    serial_port_info.clear()
+    for info, ok in zip(candidates, usable):
+        if not ok:
+            continue
+        filtered_ports.append(info.device)
+        serial_port_info[info.device] = info
+        usb = f" (USB {info.vid}:{info.pid} {info.product or ''} @ {info.location})" if info.vid else ""
+        logger.info(f"📡 Port détecté: {info.device}{usb}")
     
-    logger.info(f"🎯 {len(connections)} connexion(s) établie(s)")
-    return connections
+    logger.info(f"✅ {len(filtered_ports)} port(s) série utilisable(s) trouvé(s)")
+    return filtered_ports
+
+class SerialLineFramer:
+    """
+    Découpe le flux d'octets d'un port en lignes 'type:valeur' complètes.
+    Les octets sont lus en bloc (read(in_waiting)) dans un bytearray réutilisé;
+    la fin de ligne partielle est conservée pour la lecture suivante.
+    """
+
+    def __init__(self, max_line_length: int = MAX_LINE_LENGTH):
+        self.buffer = bytearray()
+        self.max_line_length = max_line_length
+
+    def read_from(self, ser: serial.Serial) -> int:
+        """
+        Lit tous les octets disponibles sur le port
+        Args: ser - Port série ouvert
+        Returns: Nombre d'octets lus
+        Raises: serial.SerialException si le port ne répond plus
+        """
+        # in_waiting == 0 alors que le port est signalé prêt: read(1) lève
+        # SerialException (port débranché)
+        chunk = ser.read(ser.in_waiting or 1)
+        self.buffer += chunk
+        return len(chunk)
+
+    def frames(self):
+        """
+        Génère les bornes (début, fin) de chaque ligne complète dans
+        self.buffer, sans copie, puis retire les octets consommés du tampon.
+        Le tampon ne doit pas être modifié pendant l'itération.
+        """
+        buffer = self.buffer
+        start = 0
+        try:
+            while True:
+                end = buffer.find(b'\n', start)
+                if end < 0:
+                    break
+                frame_start = start
+                start = end + 1
+                yield frame_start, end
+        finally:
+            if start:
+                del buffer[:start]
+            if len(buffer) > self.max_line_length:
+                logger.debug(f"⚠️ Ligne trop longue ignorée ({len(buffer)} octets)")
+                buffer.clear()
+
+    def clear(self):
+        """Vide le tampon (après reconnexion)"""
+        self.buffer.clear()
+
+# Cache d'identité des ports: périphérique physique -> baudrate et capteur,
+# pour reconnecter sans autodétection au démarrage suivant
+# (MEDISENSE_PORT_CACHE, par défaut dans le répertoire du journal)
+PORT_CACHE_FILE = os.environ.get('MEDISENSE_PORT_CACHE') or (os.path.join(JOURNAL_DIR, 'ports.json') if JOURNAL_DIR else None)
+
+# Octets inexploitables tolérés sur un port connecté d'après le cache avant
+# d'invalider son entrée (périphérique reconfiguré)
+PORT_CACHE_MAX_INVALID = 256
+
+class PortIdentityCache:
+    """
+    Baudrate et capteur de chaque périphérique série identifié, indexés par
+    son identité physique (USB: vid:pid et numéro de série, ou à défaut
+    chemin KERNELS; UART intégré: nom du tty), indépendante de l'ordre
+    d'énumération des ttyUSB
+    """
+    __slots__ = ('path', 'entries', 'lock', 'dirty')
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.lock = threading.Lock()
+        self.dirty = False
+        try:
+            with open(path, encoding='utf-8') as cache_file:
+                devices = json.load(cache_file).get("devices", {})
+            self.entries = {key: entry for key, entry in devices.items()
+                            if isinstance(entry, dict) and isinstance(entry.get("baudrate"), int)}
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warning(f"⚠️ Cache des ports {path} illisible, ignoré: {e}")
+
+    @staticmethod
+    def identity(info: Optional[SerialPortInfo]) -> Optional[str]:
+        """Clé stable d'un port, ou None s'il n'est pas identifiable"""
+        if info is None:
+            return None
+        if info.vid:
+            suffix = f"sn={info.serial_number}" if info.serial_number else f"@{info.location}"
+            return f"usb:{info.vid}:{info.pid}:{suffix}"
+        if info.subsystem and info.subsystem not in ('usb', 'usb-serial'):
+            return f"tty:{info.name}"
+        return None
+
+    def lookup(self, info: Optional[SerialPortInfo]) -> Optional[Dict[str, Any]]:
+        key = self.identity(info)
+        with self.lock:
+            entry = self.entries.get(key) if key else None
+            return dict(entry) if entry else None
+
+    def remember(self, info: Optional[SerialPortInfo], baudrate: int, sensor: Optional[str] = None,
+                 bare: Optional[bool] = None) -> bool:
+        """
+        Enregistre (ou met à jour) l'identification d'un port
+        Args:
+            info - Métadonnées sysfs du port
+            baudrate - Baudrate identifié
+            sensor - Capteur identifié (défaut: inchangé)
+            bare - Le capteur émet des valeurs nues (défaut: inchangé)
+        Returns: True si l'entrée a changé
+        """
+        key = self.identity(info)
+        if key is None:
+            return False
+        with self.lock:
+            previous = self.entries.get(key, {})
+            sensor = sensor or previous.get("sensor")
+            bare = previous.get("bare", False) if bare is None else bare
+            if (previous.get("baudrate"), previous.get("sensor"), previous.get("bare", False)) == (baudrate, sensor, bare):
+                return False
+            self.entries[key] = {"baudrate": baudrate, "sensor": sensor, "bare": bare,
+                                 "device": info.device, "updated": time.time()}
+            self.dirty = True
+            return True
+
+    def forget(self, info: Optional[SerialPortInfo]):
+        key = self.identity(info)
+        with self.lock:
+            if key and self.entries.pop(key, None) is not None:
+                self.dirty = True
+
+    def save(self):
+        """Écrit atomiquement le cache s'il a changé"""
+        with self.lock:
+            if not self.dirty:
+                return
+            devices = {key: dict(entry) for key, entry in self.entries.items()}
+            self.dirty = False
+        temporary = f"{self.path}.tmp"
+        try:
+            with open(temporary, 'w', encoding='utf-8') as cache_file:
+                json.dump({"devices": devices}, cache_file, indent=1, sort_keys=True)
+                cache_file.flush()
+                os.fsync(cache_file.fileno())
+            os.replace(temporary, self.path)
+        except OSError as e:
+            logger.error(f"❌ Écriture du cache des ports {self.path}: {e}")
+
+port_identity_cache: Optional[PortIdentityCache] = None
+
+def get_port_identity_cache() -> Optional[PortIdentityCache]:
+    """Cache d'identité des ports (chargé au premier appel), ou None s'il est désactivé"""
+    global port_identity_cache
+    if port_identity_cache is None and PORT_CACHE_FILE:
+        port_identity_cache = PortIdentityCache(PORT_CACHE_FILE)
+    return port_identity_cache
+
+def remember_port_identity(conn_info: Dict[str, Any], sensor: Optional[str] = None):
+    """Enregistre le baudrate (et le capteur) d'un port connecté dans le cache"""
+    cache = get_port_identity_cache()
+    if cache is not None and cache.remember(serial_port_info.get(conn_info.get('port_path')),
+                                            conn_info['baudrate'], sensor):
+        cache.save()
+
+def check_cached_baudrate(port_name: str, conn_info: Dict[str, Any], invalid: int):
+    """
+    Vérifie un port connecté au baudrate du cache tant qu'il n'a fourni
+    aucune lecture: au-delà de PORT_CACHE_MAX_INVALID octets inexploitables
+    (trames invalides ou octets sans fin de ligne), l'entrée est oubliée et
+    le port est marqué à réidentifier ('refingerprint'): la boucle de
+    lecture le retire puis le confie à refingerprint_port
+    Args:
+        port_name - Nom du port
+        conn_info - Informations de connexion du port
+        invalid - Octets de trames invalides de la dernière lecture
+    """
+    if 'sensor' in conn_info:
+        # Capteur identifié: baudrate confirmé
+        conn_info['cached'] = False
+        return
+    conn_info['invalid_bytes'] = conn_info.get('invalid_bytes', 0) + invalid
+    if conn_info['invalid_bytes'] + len(conn_info['framer'].buffer) < PORT_CACHE_MAX_INVALID:
+        return
+    conn_info['cached'] = False
+    cache = get_port_identity_cache()
+    if cache is not None:
+        cache.forget(serial_port_info.get(conn_info.get('port_path')))
+        cache.save()
+    conn_info['refingerprint'] = True
+    logger.warning(f"⚠️ {port_name}: données invalides à {conn_info['baudrate']} baud (cache), "
+                   f"entrée oubliée - réidentification")
+
+# Baudrates candidats, dans l'ordre de préférence en cas d'égalité
+BAUDRATES = [int(rate) for rate in os.environ.get('MEDISENSE_BAUDRATES', '9600,57600,115200,38400,19200').split(',')]
+
+# Durée max d'écoute d'un port à un baudrate donné (s)
+BAUD_SAMPLE_TIME = float(os.environ.get('MEDISENSE_BAUD_SAMPLE', '0.5'))
+
+# Durée max de l'identification, tous ports confondus (s)
+BAUD_PROBE_TIMEOUT = float(os.environ.get('MEDISENSE_BAUD_PROBE_TIMEOUT', '3.0'))
+
+# Trames concordantes suffisantes pour identifier un port sans écouter les
+# autres baudrates: trames préfixées 'type:valeur', ou valeurs nues classées
+# d'après leur plage (indice plus faible, il en faut davantage)
+BAUD_CONFIRM_FRAMES = 3
+BARE_CONFIRM_FRAMES = 5
+
+# Lignes examinées au plus par baudrate
+BAUD_SAMPLE_LINES = 8
+
+# Octets sans fin de ligne au-delà desquels un baudrate est abandonné
+BAUD_GARBAGE_BYTES = 256
+
+class PortFingerprint(NamedTuple):
+    """Identification d'un port: baudrate et capteur reconnus"""
+    baudrate: int
+    valid: int = 0
+    lines: int = 0
+    sensor_type: Optional[str] = None
+    # False si le capteur émet des valeurs nues (sans préfixe 'type:')
+    prefixed: bool = True
+
+    @property
+    def score(self) -> float:
+        """Fraction de trames attribuées au capteur reconnu"""
+        return self.valid / self.lines if self.lines else 0.0
+
+def classify_bare_value(raw) -> Optional[SensorSpec]:
+    """
+    Capteur probable d'une valeur nue (firmware sans préfixe): entier d'au
+    moins 4 chiffres -> capteur à code, sinon le capteur dont la plage
+    min/max contenant la valeur est la plus étroite
+    Args: raw - Ligne (octets ASCII)
+    Returns: SensorSpec, ou None si la ligne n'est pas un nombre plausible
+    """
+    text = bytes(raw).strip()
+    if not text or text.translate(None, b'0123456789.+-'):
+        return None
+    try:
+        value = float(text)
+    except ValueError:
+        return None
+    
+    if b'.' not in text and len(text.lstrip(b'+-')) >= 4:
+        return next((spec for spec in SENSOR_REGISTRY if spec.is_code), None)
+    return min((spec for spec in SENSOR_REGISTRY
+                if not spec.is_code and spec.min_value <= value <= spec.max_value),
+               key=lambda spec: spec.max_value - spec.min_value, default=None)
+
+class PortProbe:
+    """
+    Écoute d'un port pendant l'identification: les lignes reçues au
+    baudrate courant sont classées (préfixe, sinon plage de valeurs) et
+    comptées par capteur; le meilleur baudrate écouté est conservé
+    """
+    __slots__ = ('device', 'port_name', 'ser', 'rates', 'rate_index', 'window_end',
+                 'framer', 'first', 'lines', 'votes', 'prefixed', 'best')
+
+    def __init__(self, device: str, ser: serial.Serial, rates):
+        self.device = device
+        self.port_name = device.split('/')[-1]
+        self.ser = ser
+        self.rates = rates
+        self.rate_index = -1
+        self.best = PortFingerprint(rates[0])
+
+    def next_rate(self, now: float) -> bool:
+        """
+        Retient le résultat du baudrate courant et passe au suivant
+        Returns: False s'il ne reste aucun baudrate à écouter
+        """
+        if self.rate_index >= 0:
+            result = self.result()
+            logger.debug(f"🔎 {self.port_name} @ {result.baudrate}: {result.valid}/{result.lines} "
+                         f"trame(s) {result.sensor_type or ''}")
+            if (result.score, result.valid) > (self.best.score, self.best.valid):
+                self.best = result
+        self.rate_index += 1
+        if self.rate_index >= len(self.rates):
+            return False
+        self.ser.baudrate = self.rates[self.rate_index]
+        self.ser.reset_input_buffer()
+        self.window_end = now + BAUD_SAMPLE_TIME
+        self.framer = SerialLineFramer()
+        self.first = True
+        self.lines = 0
+        self.votes: Dict[str, int] = {}
+        self.prefixed = 0
+        return True
+
+    def feed(self):
+        """
+        Lit et classe les données disponibles
+        Raises: serial.SerialException si le port ne répond plus
+        """
+        framer = self.framer
+        framer.read_from(self.ser)
+        buffer = framer.buffer
+        for start, end in framer.frames():
+            reading = parse_sensor_bytes(buffer, self.port_name, start, end)
+            if reading is not None:
+                sensor, prefixed = reading.sensor_type, True
+            else:
+                spec = classify_bare_value(buffer[start:end])
+                sensor, prefixed = (spec.name if spec else None), False
+            if self.first:
+                self.first = False
+                if sensor is None:
+                    # Première ligne: probablement tronquée par l'ouverture
+                    continue
+            self.lines += 1
+            if sensor is not None:
+                self.votes[sensor] = self.votes.get(sensor, 0) + 1
+                self.prefixed += prefixed
+
+    def result(self) -> PortFingerprint:
+        """Capteur majoritaire au baudrate courant"""
+        if not self.votes:
+            return PortFingerprint(self.rates[self.rate_index], 0, self.lines)
+        sensor, count = max(self.votes.items(), key=lambda item: item[1])
+        return PortFingerprint(self.rates[self.rate_index], count, self.lines, sensor, self.prefixed >= count)
+
+    def confident(self) -> bool:
+        """Toutes les trames désignent le même capteur, en nombre suffisant"""
+        if len(self.votes) != 1:
+            return False
+        count = self.lines
+        required = BAUD_CONFIRM_FRAMES if self.prefixed == count else BARE_CONFIRM_FRAMES
+        return self.votes.get(next(iter(self.votes))) == count >= required
+
+    def exhausted(self, now: float) -> bool:
+        """Fenêtre d'écoute écoulée, assez de lignes, ou octets sans fin de ligne"""
+        return (now >= self.window_end or self.lines >= BAUD_SAMPLE_LINES
+                or (not self.votes and len(self.framer.buffer) >= BAUD_GARBAGE_BYTES))
+
+    def finish(self) -> PortFingerprint:
+        """Règle le port sur le meilleur baudrate écouté pour la lecture normale"""
+        if self.rate_index < len(self.rates):
+            self.next_rate(float('inf'))
+        self.ser.baudrate = self.best.baudrate
+        self.ser.timeout = 1
+        self.ser.reset_input_buffer()
+        return self.best
+
+def fingerprint_ports(ports_list, baudrates=None, timeout: Optional[float] = None) -> Dict[str, tuple]:
+    """
+    Identifie le baudrate et le capteur de plusieurs ports à la fois: tous
+    sont écoutés simultanément (un seul thread, sélecteur), chacun passant
+    au baudrate suivant à la fin de sa fenêtre d'écoute; un port est
+    retenu dès que ses trames désignent sans ambiguïté un capteur
+    Args:
+        ports_list - Chemins des ports
+        baudrates - Baudrates candidats (défaut: BAUDRATES)
+        timeout - Durée max de l'identification (défaut: BAUD_PROBE_TIMEOUT)
+    Returns: Dictionnaire port -> (port ouvert, PortFingerprint); ports
+             impossibles à ouvrir: (None, None)
+    """
+    baudrates = baudrates or BAUDRATES
+    deadline = time.monotonic() + (BAUD_PROBE_TIMEOUT if timeout is None else timeout)
+    results: Dict[str, tuple] = {}
+    selector = selectors.DefaultSelector()
+    
+    def finish(probe, failed=False):
+        selector.unregister(probe.ser.fileno())
+        if not failed:
+            try:
+                results[probe.device] = (probe.ser, probe.finish())
+                return
+            except serial.SerialException as e:
+                logger.debug(f"❌ Échec identification {probe.device}: {e}")
+        probe.ser.close()
+        results[probe.device] = (None, None)
+    
+    now = time.monotonic()
+    for port in ports_list:
+        try:
+            ser = serial.Serial(port, baudrates[0], timeout=0)
+            probe = PortProbe(port, ser, baudrates)
+            probe.next_rate(now)
+            selector.register(ser.fileno(), selectors.EVENT_READ, probe)
+        except (serial.SerialException, OSError) as e:
+            logger.debug(f"❌ Échec connexion {port}: {e}")
+            results[port] = (None, None)
+    
+    try:
+        while selector.get_map():
+            now = time.monotonic()
+            probes = [key.data for key in selector.get_map().values()]
+            if now >= deadline:
+                for probe in probes:
+                    finish(probe)
+                break
+            
+            for probe in probes:
+                if probe.exhausted(now) and not probe.next_rate(now):
+                    finish(probe)
+            if not selector.get_map():
+                break
+            
+            wait = min([probe.window_end for probe in probes if probe.device not in results] + [deadline]) - now
+            for key, _ in selector.select(max(wait, 0)):
+                probe = key.data
+                try:
+                    probe.feed()
+                except serial.SerialException as e:
+                    logger.debug(f"❌ Échec lecture {probe.device}: {e}")
+                    finish(probe, failed=True)
+                    continue
+                if probe.confident():
+                    finish(probe)
+    finally:
+        # Erreur inattendue: ne laisser aucun port de test ouvert
+        for key in list(selector.get_map().values()):
+            key.data.ser.close()
+            results[key.data.device] = (None, None)
+        selector.close()
+    
+    return {port: results[port] for port in ports_list}
+
+def connect_to_ports(ports_list):
+    """
+    Établit les connexions avec tous les ports disponibles. Les périphériques
+    connus du cache d'identité sont ouverts directement à leur baudrate; les
+    autres sont identifiés (baudrate et capteur) d'après les données reçues,
+    tous à la fois, en au plus BAUD_PROBE_TIMEOUT (fingerprint_ports)
+    Args: ports_list - Liste des ports à connecter
+    Returns: Dictionnaire des connexions établies
+    """
+    logger.info("🔌 Connexion aux ports série...")
+    
+    connections = {}
+    cache = get_port_identity_cache()
+    
+    def add_connection(port, ser, baudrate, cached=False, bare_sensor=None):
+        port_name = port.split('/')[-1]  # Extraire le nom du port
+        connections[port_name] = {
+            'serial': ser,
+            'port_path': port,
+            'baudrate': baudrate,
+            'last_data': None,
+            'error_count': 0,
+            'framer': SerialLineFramer(),
+            'cached': cached,
+            # Capteur des valeurs nues (firmware sans préfixe 'type:')
+            'bare_sensor': SENSOR_REGISTRY.resolve(bare_sensor) if bare_sensor else None
+        }
+        return port_name
+    
+    # Périphériques déjà identifiés: connexion immédiate au baudrate connu
+    to_probe = []
+    for port in ports_list:
+        entry = cache.lookup(serial_port_info.get(port)) if cache is not None else None
+        if entry is None:
+            to_probe.append(port)
+            continue
+        try:
+            ser = serial.Serial(port, entry['baudrate'], timeout=1)
+        except serial.SerialException as e:
+            logger.debug(f"❌ Échec connexion {port} @ {entry['baudrate']}: {e}")
+            to_probe.append(port)
+            continue
+        port_name = add_connection(port, ser, entry['baudrate'], cached=True,
+                                   bare_sensor=entry.get('sensor') if entry.get('bare') else None)
+        logger.info(f"✅ {port_name} connecté à {entry['baudrate']} baud (cache: {entry.get('sensor') or '?'})")
+    
+    results = fingerprint_ports(to_probe) if to_probe else {}
+    for port, (ser, fingerprint) in results.items():
+        if ser is None:
+            logger.warning(f"⚠️ Impossible de connecter {port}")
+            continue
+        
+        bare_sensor = fingerprint.sensor_type if not fingerprint.prefixed else None
+        port_name = add_connection(port, ser, fingerprint.baudrate, bare_sensor=bare_sensor)
+        if fingerprint.valid:
+            kind = " valeurs nues" if bare_sensor else ""
+            logger.info(f"✅ {port_name} connecté à {fingerprint.baudrate} baud "
+                        f"({fingerprint.sensor_type}{kind}, {fingerprint.valid}/{fingerprint.lines} trames)")
+            if cache is not None:
+                cache.remember(serial_port_info.get(port), fingerprint.baudrate,
+                               fingerprint.sensor_type, bare=bare_sensor is not None)
+        else:
+            logger.warning(f"⚠️ {port_name}: aucune trame valide reçue, connecté à {fingerprint.baudrate} baud par défaut")
+    
+    if cache is not None:
+        cache.save()
+    logger.info(f"🎯 {len(connections)} connexion(s) établie(s)")
+    return connections
+
+# Réidentification des ports dont le baudrate du cache est rejeté (hors des
+# boucles de lecture: l'écoute dure jusqu'à BAUD_PROBE_TIMEOUT)
+refingerprint_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="PortRefingerprint")
+
+def refingerprint_port(port_name: str, conn_info: Dict[str, Any]) -> bool:
+    """
+    Réidentifie (baudrate et capteur) un port dont le baudrate du cache a
+    été rejeté, puis remplace son port série et met le cache à jour.
+    L'ancien port série doit avoir été retiré de la boucle de lecture et
+    fermé
+    Args:
+        port_name - Nom du port
+        conn_info - Informations de connexion du port (modifiées)
+    Returns: True si le port est rouvert au baudrate identifié
+    """
+    port = conn_info['port_path']
+    ser, fingerprint = fingerprint_ports([port])[port]
+    if ser is None or port_unplugged(conn_info):
+        if ser is not None:
+            ser.close()
+        logger.error(f"❌ {port_name}: réidentification impossible")
+        return False
+    
+    bare_sensor = fingerprint.sensor_type if not fingerprint.prefixed else None
+    conn_info['framer'].clear()
+    conn_info.update(baudrate=fingerprint.baudrate, error_count=0, invalid_bytes=0,
+                     bare_sensor=SENSOR_REGISTRY.resolve(bare_sensor) if bare_sensor else None)
+    conn_info['serial'] = ser
+    if fingerprint.valid:
+        logger.info(f"✅ {port_name} réidentifié à {fingerprint.baudrate} baud ({fingerprint.sensor_type}, "
+                    f"{fingerprint.valid}/{fingerprint.lines} trames)")
+        cache = get_port_identity_cache()
+        if cache is not None and cache.remember(serial_port_info.get(port), fingerprint.baudrate,
+                                                fingerprint.sensor_type, bare=bare_sensor is not None):
+            cache.save()
+    else:
+        logger.warning(f"⚠️ {port_name}: aucune trame valide reçue, reconnecté à {fingerprint.baudrate} baud par défaut")
+    return True
+
+def parse_sensor_data(raw_data: str, port_name: str) -> tuple:
+    """
+    Parse les données reçues d'un capteur selon le format préfixe:valeur
+    Args: 
+        raw_data - Données brutes reçues
+        port_name - Nom du port source
+    Returns: (sensor_type, value, success)
+    """
+    try:
+        # Nettoyer les données
+        data = raw_data.strip()
+        
+        if not data:
+            return None, None, False
+        
+        # Vérifier le format préfixe:valeur
+        if ':' not in data:
+            logger.debug(f"📥 {port_name}: Format non reconnu: '{data}'")
+            return None, None, False
+        
+        # Séparer préfixe et valeur
+        parts = data.split(':', 1)  # Split seulement sur le premier ':'
+        if len(parts) != 2:
+            logger.debug(f"📥 {port_name}: Format invalide: '{data}'")
+            return None, None, False
+        
+        sensor_type = parts[0].lower().strip()
+        value_str = parts[1].strip()
+        
+        # Vérifier si le type de capteur est connu (nom canonique ou alias)
+        spec = SENSOR_REGISTRY.resolve(sensor_type)
+        if spec is None:
+            logger.debug(f"📥 {port_name}: Type capteur inconnu: '{sensor_type}'")
+            return None, None, False
+        
+        # Convertir la valeur selon le type (entier pour les codes, précision sinon)
+        try:
+            value = spec.convert(value_str)
+        except ValueError as e:
+            logger.warning(f"❌ {port_name}: Impossible de convertir '{value_str}': {e}")
+            return None, None, False
+        
+        logger.debug(f"📊 {port_name}: {spec.name} = {value}")
+        return spec.name, value, True
+        
+    except Exception as e:
+        logger.error(f"❌ Erreur parsing données de {port_name}: {e}")
+        return None, None, False
+
+class SensorReading(NamedTuple):
+    """Lecture décodée d'une ligne capteur"""
+    sensor_type: str
+    value: Any
+
+def parse_sensor_bytes(buffer, port_name: str, start: int = 0, end: Optional[int] = None) -> Optional[SensorReading]:
+    """
+    Variante de parse_sensor_data travaillant directement sur les octets reçus
+    (tampon du SerialLineFramer), sans décoder la ligne en str. Les préfixes
+    sont résolus par l'index en octets du registre (SENSOR_REGISTRY.by_prefix).
+    Les lignes inhabituelles (préfixe non ASCII, valeur non convertible...) sont
+    confiées à parse_sensor_data pour garantir un résultat identique.
+    Args:
+        buffer - bytes ou bytearray contenant la ligne
+        port_name - Nom du port source
+        start, end - Bornes de la ligne dans le tampon
+    Returns: SensorReading, ou None si la ligne est ignorée
+    """
+    if end is None:
+        end = len(buffer)
+    
+    colon = buffer.find(b':', start, end)
+    if colon >= 0:
+        prefixes = SENSOR_REGISTRY.by_prefix
+        prefix = bytes(buffer[start:colon])
+        spec = prefixes.get(prefix)
+        if spec is None:
+            spec = prefixes.get(prefix.strip().lower())
+        
+        if spec is not None:
+            try:
+                # float() accepte directement les octets ASCII (espaces compris)
+                if spec.is_code:
+                    value = int(float(buffer[colon + 1:end]))
+                else:
+                    value = round(float(buffer[colon + 1:end]), spec.precision)
+                return _new_reading(SensorReading, (spec.name, value))
+            except (ValueError, OverflowError):
+                # OverflowError: code infini ('card:inf')
+                pass
+    
+    # Chemin lent: même résultat (et mêmes logs) que parse_sensor_data
+    raw_data = buffer[start:end].decode('utf-8', errors='ignore')
+    sensor_type, value, success = parse_sensor_data(raw_data, port_name)
+    return SensorReading(sensor_type, value) if success else None
+
+# Construction rapide d'un SensorReading (évite le __new__ Python du NamedTuple)
+_new_reading = tuple.__new__
+
+def parse_bare_value(buffer, spec: SensorSpec, start: int = 0, end: Optional[int] = None) -> Optional[SensorReading]:
+    """Lecture d'une valeur nue sur un port identifié comme 'spec'"""
+    try:
+        value = spec.convert(bytes(buffer[start:end]))
+    except (ValueError, OverflowError):
+        return None
+    return _new_reading(SensorReading, (spec.name, value))
+
+def validate_sensor_value(sensor_type: str, value) -> bool:
+    """
+    Valide une valeur de capteur selon sa configuration
+    Args:
+        sensor_type - Type du capteur
+        value - Valeur à valider
+    Returns: True si valide, False sinon
+    """
+    spec = SENSOR_REGISTRY.resolve(sensor_type)
+    if spec is None:
+        return False
+    
+    try:
+        # Code attendu pour la validation, plage min/max pour les autres
+        return spec.accepts(value)
+    
+    except Exception as e:
+        logger.error(f"❌ Erreur validation {sensor_type}: {e}")
+        return False
+
+def active_sensor_keys(snapshot: Optional[SensorSnapshot] = None) -> list:
+    """
+    Liste les clés de sensor_data ayant une valeur (capteur canonique suivi
+    de ses clés historiques, dans l'ordre du protocole)
+    Args: snapshot - Instantané à utiliser (courant par défaut)
+    Returns: Liste des clés actives
+    """
+    values = (snapshot or current_snapshot).values
+    keys = []
+    for spec in SENSOR_REGISTRY:
+        if values[spec.sensor_id] is not None:
+            keys.append(spec.name)
+            keys.extend(spec.legacy_keys)
+    return keys
+
+def update_sensor_data(sensor_type: str, value, port_name: str):
+    """
+    Met à jour les données globales des capteurs
+    Args:
+        sensor_type - Type du capteur
+        value - Nouvelle valeur
+        port_name - Port source
+    """
+    if not validate_sensor_value(sensor_type, value):
+        logger.warning(f"⚠️ {port_name}: Valeur {sensor_type}={value} hors limites")
+        return False
+    
+    spec = SENSOR_REGISTRY[sensor_type]
+    
+    # Une seule écriture: les aliases sont des vues sur le même emplacement
+    snapshot = publish_sensor_value(spec.sensor_id, value)
+    record_reading(spec.sensor_id, value, snapshot.timestamp, port_name, snapshot.version)
+    
+    # Log de mise à jour
+    logger.info(f"📊 {spec.name.capitalize()}: {value}{spec.unit} (depuis {port_name})")
+    
+    return True
+
+def process_serial_port(port_name: str, conn_info: Dict[str, Any]) -> bool:
+    """
+    Lit tous les octets disponibles sur un port et traite chaque ligne complète
+    Args:
+        port_name - Nom du port
+        conn_info - Informations de connexion du port (voir connect_to_ports)
+    Returns: True si au moins une valeur a été acceptée
+    Raises: serial.SerialException en cas d'erreur de lecture
+    """
+    framer = conn_info['framer']
+    framer.read_from(conn_info['serial'])
+    
+    data_received = False
+    invalid = 0
+    buffer = framer.buffer
+    bare_sensor = conn_info.get('bare_sensor')
+    for start, end in framer.frames():
+        reading = None
+        if bare_sensor is not None:
+            reading = parse_bare_value(buffer, bare_sensor, start, end)
+        if reading is None:
+            reading = parse_sensor_bytes(buffer, port_name, start, end)
+        if reading is not None:
+            if handle_sensor_reading(port_name, conn_info, reading):
+                data_received = True
+        else:
+            invalid += end - start + 1
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"📥 {port_name}: Données ignorées: {bytes(buffer[start:end])!r}")
+    if conn_info.get('cached') and not data_received:
+        check_cached_baudrate(port_name, conn_info, invalid)
+    return data_received
+
+def handle_sensor_reading(port_name: str, conn_info: Dict[str, Any], reading: SensorReading) -> bool:
+    """
+    Applique une lecture décodée aux données globales
+    Returns: True si la valeur a été acceptée
+    """
+    if update_sensor_data(reading.sensor_type, reading.value, port_name):
+        conn_info['last_data'] = time.time()
+        conn_info['error_count'] = 0
+        note_port_sensor(port_name, conn_info, reading.sensor_type)
+        return True
+    return False
+
+def handle_serial_error(port_name: str, conn_info: Dict[str, Any], error: Exception) -> bool:
+    """
+    Comptabilise une erreur de lecture et reconnecte le port si nécessaire
+    Args:
+        port_name - Nom du port
+        conn_info - Informations de connexion du port
+        error - Exception levée
+    Returns: True si le port a été reconnecté (nouvel objet serial)
+    """
+    conn_info['error_count'] += 1
+    logger.error(f"❌ Erreur lecture {port_name}: {error}")
+
+    # Reconnecter si trop d'erreurs
+    if conn_info['error_count'] > 5:
+        return reconnect_serial_port(port_name, conn_info)
+
+    return False
+
+def reconnect_serial_port(port_name: str, conn_info: Dict[str, Any]) -> bool:
+    """
+    Ferme puis rouvre un port avec son baudrate d'origine
+    Returns: True si la reconnexion a réussi
+    """
+    logger.warning(f"🔄 Tentative de reconnexion {port_name}...")
+    try:
+        conn_info['serial'].close()
+        time.sleep(1)
+        new_ser = serial.Serial(conn_info['port_path'], conn_info['baudrate'], timeout=1)
+        conn_info['serial'] = new_ser
+        conn_info['error_count'] = 0
+        conn_info['framer'].clear()
+        logger.info(f"✅ {port_name} reconnecté")
+        return True
+    except Exception as reconnect_error:
+        logger.error(f"❌ Échec reconnexion {port_name}: {reconnect_error}")
+        return False
+
+# Surveillance de /dev: attachement/détachement à chaud des ports série
+HOTPLUG_ENABLED = os.environ.get('MEDISENSE_HOTPLUG', '1') != '0'
+
+# Masques inotify (linux/inotify.h) et en-tête d'un événement
+IN_ATTRIB = 0x004
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+INOTIFY_EVENT = struct.Struct('iIII')
+
+class DeviceWatcher:
+    """
+    Signale la création et la suppression des nœuds tty d'un répertoire
+    (/dev) via inotify, appelé par ctypes. Le descripteur est non bloquant
+    et peut être surveillé par un sélecteur (fileno())
+    Raises (constructeur): OSError si inotify est indisponible
+    """
+    __slots__ = ('directory', 'fd')
+
+    def __init__(self, directory: str = '/dev'):
+        self.directory = directory
+        libc = ctypes.CDLL(None, use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError("inotify indisponible")
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        mask = IN_CREATE | IN_DELETE | IN_ATTRIB | IN_MOVED_FROM | IN_MOVED_TO
+        if libc.inotify_add_watch(fd, os.fsencode(directory), mask) < 0:
+            error = ctypes.get_errno()
+            os.close(fd)
+            raise OSError(error, f"inotify_add_watch {directory}")
+        self.fd = fd
+
+    def fileno(self) -> int:
+        return self.fd
+
+    def read(self) -> list:
+        """
+        Événements en attente concernant des ports série
+        Returns: Liste de (nom, présent): présent est False pour une
+                 suppression, True pour une création ou un changement de
+                 droits (posés par udev après la création)
+        """
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, 4096)
+            except BlockingIOError:
+                return events
+            offset = 0
+            while offset + INOTIFY_EVENT.size <= len(data):
+                _, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+                offset += INOTIFY_EVENT.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+                offset += length
+                if is_serial_port_name(name):
+                    events.append((name, not mask & (IN_DELETE | IN_MOVED_FROM)))
+
+    def close(self):
+        os.close(self.fd)
+
+class PortHotplug:
+    """
+    Gestionnaire des ports branchés à chaud. Un thread attend les événements
+    du DeviceWatcher, connecte chaque nouveau port (cache d'identité, sinon
+    identification) et transmet attachements et détachements au lecteur
+    série par une file, signalée sur un tube surveillable (fileno()): le
+    lecteur n'est ni redémarré ni bloqué, aucune redécouverte n'a lieu
+    """
+    __slots__ = ('watcher', 'dev_root', 'sysfs_root', 'known', 'waiting', 'events',
+                 'wake_read', 'wake_write', 'attached', 'stopping', 'thread')
+
+    def __init__(self, watcher: DeviceWatcher, connections: Dict[str, Dict[str, Any]],
+                 sysfs_root: str = SYSFS_TTY_ROOT):
+        self.watcher = watcher
+        self.dev_root = watcher.directory
+        self.sysfs_root = sysfs_root
+        # Ports attachés (chemins), et ports créés mais pas encore ouvrables
+        self.known = {conn_info['port_path'] for conn_info in connections.values()}
+        self.waiting = set()
+        self.events = queue.SimpleQueue()
+        self.wake_read, self.wake_write = os.pipe()
+        os.set_blocking(self.wake_read, False)
+        os.set_blocking(self.wake_write, False)
+        # Signalé au premier attachement (fin du mode simulation)
+        self.attached = threading.Event()
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True, name="PortHotplug")
+
+    def fileno(self) -> int:
+        return self.wake_read
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopping.set()
+        self.thread.join(timeout=SELECT_TIMEOUT + 1)
+        self.watcher.close()
+        os.close(self.wake_read)
+        os.close(self.wake_write)
+
+    def run(self):
+        selector = selectors.DefaultSelector()
+        selector.register(self.watcher.fileno(), selectors.EVENT_READ)
+        try:
+            while not (self.stopping.is_set() or shutdown_event.is_set()):
+                if not selector.select(timeout=SELECT_TIMEOUT):
+                    continue
+                # Dernier état connu de chaque nœud (créé puis supprimé...)
+                changes = dict(self.watcher.read())
+                for name, present in changes.items():
+                    try:
+                        if present:
+                            self.device_added(name)
+                        else:
+                            self.device_removed(name)
+                    except Exception as e:
+                        logger.error(f"❌ Hotplug {name}: {e}")
+        finally:
+            selector.close()
+
+    def device_added(self, name: str):
+        device = os.path.join(self.dev_root, name)
+        if device in self.known or not os.path.exists(device):
+            return
+        if os.path.isdir(self.sysfs_root):
+            info = read_tty_sysfs(name, self.sysfs_root, self.dev_root)
+            if info is None:
+                return
+        else:
+            info = SerialPortInfo(device, name)
+        serial_port_info[device] = info
+        
+        connections = connect_to_ports([device])
+        if not connections:
+            # Nouvel essai au prochain changement de droits (udev)
+            self.waiting.add(device)
+            return
+        self.waiting.discard(device)
+        self.known.add(device)
+        for port_name, conn_info in connections.items():
+            self.post(('attach', port_name, conn_info))
+        self.attached.set()
+
+    def device_removed(self, name: str):
+        device = os.path.join(self.dev_root, name)
+        self.waiting.discard(device)
+        if device not in self.known:
+            return
+        self.known.discard(device)
+        serial_port_info.pop(device, None)
+        self.post(('detach', name, None))
+
+    def post(self, event: tuple):
+        self.events.put(event)
+        try:
+            os.write(self.wake_write, b'\0')
+        except BlockingIOError:
+            pass  # Réveil déjà en attente
+
+    def drain(self) -> list:
+        """Événements ('attach' | 'detach', port, conn_info) en attente"""
+        try:
+            while os.read(self.wake_read, 4096):
+                pass
+        except BlockingIOError:
+            pass
+        events = []
+        while True:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                return events
+
+port_hotplug: Optional[PortHotplug] = None
+
+def start_port_hotplug(connections: Dict[str, Dict[str, Any]], dev_root: str = '/dev',
+                       sysfs_root: str = SYSFS_TTY_ROOT) -> Optional[PortHotplug]:
+    """Démarre la surveillance des ports branchés à chaud (si disponible)"""
+    global port_hotplug
+    if not HOTPLUG_ENABLED:
+        return None
+    try:
+        watcher = DeviceWatcher(dev_root)
+    except (OSError, AttributeError) as e:
+        logger.warning(f"⚠️ Surveillance des ports branchés à chaud indisponible: {e}")
+        return None
+    port_hotplug = PortHotplug(watcher, connections, sysfs_root)
+    port_hotplug.start()
+    logger.info(f"👀 Surveillance des ports branchés à chaud ({dev_root})")
+    return port_hotplug
+
+def stop_port_hotplug():
+    global port_hotplug
+    if port_hotplug is not None:
+        port_hotplug.stop()
+        port_hotplug = None
+
+def port_unplugged(conn_info: Dict[str, Any]) -> bool:
+    """Port disparu de /dev alors que son détachement va être signalé"""
+    return port_hotplug is not None and not os.path.exists(conn_info['port_path'])
+
+def apply_port_events(hotplug: PortHotplug, connections: Dict[str, Dict[str, Any]],
+                      on_attach=None, on_detach=None):
+    """
+    Applique aux connexions du lecteur les ports attachés et détachés
+    signalés par le gestionnaire hotplug
+    Args:
+        hotplug - Gestionnaire PortHotplug
+        connections - Connexions du lecteur (modifiées)
+        on_attach, on_detach - Rappels (port_name, conn_info) du lecteur
+                               (enregistrement du descripteur...)
+    """
+    for action, port_name, conn_info in hotplug.drain():
+        previous = connections.pop(port_name, None)
+        if previous is not None:
+            if on_detach is not None:
+                on_detach(port_name, previous)
+            try:
+                previous['serial'].close()
+            except Exception as e:
+                logger.debug(f"⚠️ Fermeture {port_name}: {e}")
+            logger.info(f"🔌 {port_name} détaché")
+        if action == 'attach':
+            connections[port_name] = conn_info
+            if on_attach is not None:
+                on_attach(port_name, conn_info)
+            logger.info(f"🔌 {port_name} attaché à chaud ({conn_info['baudrate']} baud)")
+
+def poll_serial_ports(connections: Dict[str, Dict[str, Any]]):
+    """
+    Boucle de lecture par scrutation: parcourt les ports puis dort 0.05s/0.2s
+    Args: connections - Connexions établies par connect_to_ports
+    """
+    # Ports en cours de réidentification (port -> (conn_info, Future)), et
+    # ports à reconnecter au prochain tour (réidentification échouée)
+    reidentifying = {}
+    pending = {}
+    
+    while not shutdown_event.is_set():
+        try:
+            data_received = False
+            
+            if port_hotplug is not None:
+                apply_port_events(port_hotplug, connections)
+            
+            for port_name, (conn_info, future) in list(reidentifying.items()):
+                if future.done():
+                    del reidentifying[port_name]
+                    if not future.result():
+                        pending[port_name] = conn_info
+            
+            # Retenter les ports perdus (sauf s'ils ont été détachés)
+            for port_name, conn_info in list(pending.items()):
+                if connections.get(port_name) is not conn_info or reconnect_serial_port(port_name, conn_info):
+                    del pending[port_name]
+            
+            # Lire chaque port connecté
+            for port_name, conn_info in connections.items():
+                ser = conn_info['serial']
+                
+                try:
+                    if not ser.is_open:
+                        continue
+                    
+                    # Lire les données disponibles
+                    if ser.in_waiting > 0:
+                        if process_serial_port(port_name, conn_info):
+                            data_received = True
+                        if conn_info.pop('refingerprint', False):
+                            # Port fermé (ignoré) jusqu'au remplacement de son port série
+                            ser.close()
+                            reidentifying[port_name] = (
+                                conn_info, refingerprint_executor.submit(refingerprint_port, port_name, conn_info))
+                
+                except serial.SerialException as e:
+                    if not port_unplugged(conn_info):
+                        handle_serial_error(port_name, conn_info, e)
+                
+                except Exception as e:
+                    logger.error(f"❌ Erreur inattendue {port_name}: {e}")
+            
+            # Pause adaptative
+            time.sleep(0.05 if data_received else 0.2)
+            
+        except Exception as e:
+            logger.error(f"❌ Erreur critique dans la boucle de lecture: {e}")
+            time.sleep(1)
+
+def select_serial_ports(connections: Dict[str, Dict[str, Any]]):
+    """
+    Boucle de lecture événementielle: attend sur les descripteurs de tous les
+    ports (selectors/epoll) et ne se réveille qu'à l'arrivée de données
+    Args: connections - Connexions établies par connect_to_ports
+    """
+    selector = selectors.DefaultSelector()
+    # Ports à (ré)enregistrer au prochain tour (reconnexion échouée)
+    pending = {}
+    # Ports en cours de réidentification: port -> (conn_info, Future)
+    reidentifying = {}
+
+    def register(port_name, conn_info):
+        try:
+            selector.register(conn_info['serial'].fileno(), selectors.EVENT_READ, (port_name, conn_info))
+            pending.pop(port_name, None)
+        except (ValueError, OSError, serial.SerialException) as e:
+            logger.debug(f"⚠️ {port_name}: enregistrement impossible: {e}")
+            pending[port_name] = conn_info
+
+    def unregister(conn_info):
+        for key in list(selector.get_map().values()):
+            if key.data is not None and key.data[1] is conn_info:
+                selector.unregister(key.fileobj)
+
+    def detach(port_name, conn_info):
+        unregister(conn_info)
+        pending.pop(port_name, None)
+        reidentifying.pop(port_name, None)
+
+    for port_name, conn_info in connections.items():
+        if conn_info['serial'].is_open:
+            register(port_name, conn_info)
+    
+    # Réveil du gestionnaire hotplug (ports attachés/détachés)
+    hotplug = port_hotplug
+    if hotplug is not None:
+        selector.register(hotplug.fileno(), selectors.EVENT_READ, None)
+
+    try:
+        while not shutdown_event.is_set():
+            try:
+                if not selector.get_map():
+                    # Aucun port surveillé: attendre avant de retenter
+                    shutdown_event.wait(SELECT_TIMEOUT)
+                    events = []
+                else:
+                    events = selector.select(timeout=SELECT_TIMEOUT)
+
+                for key, _ in events:
+                    if key.data is None:
+                        apply_port_events(hotplug, connections, register, detach)
+                        continue
+                    port_name, conn_info = key.data
+                    try:
+                        process_serial_port(port_name, conn_info)
+                        if conn_info.pop('refingerprint', False):
+                            unregister(conn_info)
+                            conn_info['serial'].close()
+                            reidentifying[port_name] = (
+                                conn_info, refingerprint_executor.submit(refingerprint_port, port_name, conn_info))
+
+                    except serial.SerialException as e:
+                        if port_unplugged(conn_info):
+                            # Débranché: le détachement suit (hotplug)
+                            unregister(conn_info)
+                            continue
+                        ser = conn_info['serial']
+                        if handle_serial_error(port_name, conn_info, e) or conn_info['error_count'] > 5:
+                            # Le descripteur a changé (ou le port est perdu)
+                            unregister(conn_info)
+                            if conn_info['serial'] is not ser:
+                                register(port_name, conn_info)
+                            else:
+                                pending[port_name] = conn_info
+
+                    except Exception as e:
+                        logger.error(f"❌ Erreur inattendue {port_name}: {e}")
+
+                # Ports réidentifiés: nouveau descripteur
+                for port_name, (conn_info, future) in list(reidentifying.items()):
+                    if future.done():
+                        del reidentifying[port_name]
+                        if future.result():
+                            register(port_name, conn_info)
+                        else:
+                            pending[port_name] = conn_info
+
+                # Retenter les ports perdus
+                for port_name, conn_info in list(pending.items()):
+                    if reconnect_serial_port(port_name, conn_info):
+                        register(port_name, conn_info)
+
+            except Exception as e:
+                logger.error(f"❌ Erreur critique dans la boucle de lecture: {e}")
+                time.sleep(1)
+    finally:
+        selector.close()
+
+def close_serial_connections(connections: Dict[str, Dict[str, Any]]):
+    """Fermeture propre des connexions série"""
+    logger.info("🔌 Fermeture des connexions série...")
+    for port_name, conn_info in connections.items():
+        try:
+            if conn_info['serial'].is_open:
+                conn_info['serial'].close()
+                logger.info(f"🔌 {port_name} fermé")
+        except Exception as e:
+            logger.error(f"❌ Erreur fermeture {port_name}: {e}")
+
+def open_serial_connections() -> Dict[str, Dict[str, Any]]:
+    """
+    Découvre les ports série et établit les connexions
+    Returns: Dictionnaire des connexions (vide si aucun port utilisable)
+    """
+    # Découvrir les ports disponibles
+    available_ports = discover_serial_ports()
+    
+    if not available_ports:
+        logger.warning("⚠️ Aucun port série disponible! Démarrage en mode SIMULATION...")
+        return {}
+    
+    # Établir les connexions
+    connections = connect_to_ports(available_ports)
+    
+    if not connections:
+        logger.warning("⚠️ Aucune connexion établie! Démarrage en mode SIMULATION...")
+    
+    return connections
+
+def read_serial_data():
+    """Fonction principale qui lit en continu les données de tous les ports série"""
+    logger.info("🚀 Démarrage de la lecture des données série...")
+    
+    connections = open_serial_connections()
+    start_port_hotplug(connections)
+    
+    try:
+        if not connections:
+            # Sans gestionnaire hotplug, la simulation dure jusqu'à l'arrêt
+            run_simulation_mode()
+            if port_hotplug is None or shutdown_event.is_set():
+                return
+            clear_simulated_values()
+        
+        logger.info(f"✅ Lecture démarrée sur {len(connections)} port(s) (mode {SERIAL_READER_MODE})")
+        
+        # Boucle principale de lecture
+        if SERIAL_READER_MODE == 'poll':
+            poll_serial_ports(connections)
+        else:
+            select_serial_ports(connections)
+    finally:
+        stop_port_hotplug()
+        close_serial_connections(connections)
+
+def simulation_step(counter: int, last_validation_time: float) -> float:
+    """
+    Génère un jeu de données fictives
+    Args:
+        counter - Numéro de l'itération
+        last_validation_time - Date de la dernière validation simulée
+    Returns: Date de la dernière validation simulée (mise à jour)
+    """
+    current_time = time.time()
+    
+    # Simulation de données réalistes
+    changes = {
+        POIDS: round(70.5 + (counter % 20) * 0.1, 1),
+        TEMPERATURE: round(36.5 + (counter % 8) * 0.05, 1),
+    }
+    
+    # Validation toutes les 30 secondes
+    if current_time - last_validation_time > 30:
+        changes[VALIDATION] = refValidateCard
+        last_validation_time = current_time
+        logger.info(f"✅ [SIMULATION] Validation générée: {refValidateCard}")
+    
+    # Valeurs fictives: ni historique, ni agrégats, ni persistance
+    # (elles se mêleraient aux lectures réelles après le branchement d'un capteur)
+    snapshot = publish_sensor_values(changes)
+    
+    # Log périodique
+    if counter % 10 == 0:
+        logger.info(f"📊 [SIMULATION] Poids: {snapshot[POIDS]}kg, "
+                  f"Température: {snapshot[TEMPERATURE]}°C")
+    
+    return last_validation_time
+
+def clear_simulated_values():
+    """
+    Efface les valeurs fictives à la fin du mode simulation (premier capteur
+    branché): elles ne doivent pas passer pour des mesures réelles
+    """
+    global simulation_active
+    publish_sensor_values({spec.sensor_id: None for spec in SENSOR_REGISTRY})
+    simulation_active = False
+    logger.info("🧹 Valeurs simulées effacées")
+
+def run_simulation_mode():
+    """Mode simulation avec données fictives (jusqu'au branchement d'un capteur)"""
+    global simulation_active
+    simulation_active = True
+    logger.info("🎭 Mode SIMULATION activé")
+    
+    counter = 0
+    last_validation_time = 0
+    
+    while not shutdown_event.is_set():
+        if port_hotplug is not None and port_hotplug.attached.is_set():
+            logger.info("🔌 Capteur branché: fin du mode SIMULATION")
+            return
+        try:
+            counter += 1
+            last_validation_time = simulation_step(counter, last_validation_time)
+            if port_hotplug is not None:
+                port_hotplug.attached.wait(2)
+            else:
+                time.sleep(2)
+            
+        except Exception as e:
+            logger.error(f"❌ Erreur en mode simulation: {e}")
+            time.sleep(1)
+
+def format_sensor_message(spec: SensorSpec, value) -> str:
+    """
+    Formate la réponse individuelle d'un capteur (ex: 'Poids:70.5')
+    Les valeurs absentes ou nulles (et les codes invalides) donnent 'Label:0'
+    """
+    if spec.is_code:
+        return f"{spec.label}:{value}" if value == spec.expected_value else f"{spec.label}:0"
+    return f"{spec.label}:{value}" if value is not None and value > 0 else f"{spec.label}:0"
+
+def render_all_mesure_prefix(snapshot: SensorSnapshot) -> str:
+    """
+    Formate la partie de la réponse 'all-mesure' qui ne dépend que de
+    l'instantané (poids, température, taille); la validation est ajoutée
+    à chaque requête car elle est consommée une seule fois
+    """
+    mesures = []
+    
+    # Poids
+    poids_val = snapshot[POIDS]
+    mesures.append(f"poids:{poids_val}" if poids_val is not None and poids_val > 0 else "poids:0")
+    
+    # Température
+    temp_val = snapshot[TEMPERATURE]
+    mesures.append(f"temperature:{temp_val}" if temp_val is not None and temp_val > 0 else "temperature:0")
+    
+    # Taille
+    taille_val = snapshot[TAILLE]
+    mesures.append(f"taille:{taille_val}" if taille_val is not None and taille_val > 0 else "taille:0")
+    
+    return "All-Mesure:" + ":".join(mesures) + ":"
+
+# Enregistrement binaire d'une mesure (21 octets, petit-boutiste):
+# sensor_id (u8), séquence = version de l'instantané (u32),
+# horodatage (f64, secondes epoch), valeur (f64, NaN si absente)
+BINARY_RECORD = struct.Struct('<BIdd')
+
+def reading_value(spec: SensorSpec, value):
+    """Valeur exposée d'un capteur (None là où le protocole texte affiche 0)"""
+    if spec.is_code:
+        return value if value == spec.expected_value else None
+    return value if value is not None and value > 0 else None
+
+def delta_fields(spec: SensorSpec, seq: int, timestamp: float, value, stale: bool = False) -> dict:
+    """Champs JSON d'une mesure (valeur déjà passée par reading_value)"""
+    fields = {"type": "mesure", "sensor": spec.name, "value": value,
+              "unit": spec.unit, "seq": seq, "ts": timestamp}
+    if stale:
+        # Valeur restaurée au démarrage, pas encore relue
+        fields["stale"] = True
+    return fields
+
+def encode_delta(protocol: str, spec: SensorSpec, seq: int, timestamp: float, value):
+    """
+    Encode le changement d'un capteur (mise à jour poussée ou rejouée)
+    Args:
+        protocol - PROTOCOL_TEXT, PROTOCOL_JSON ou PROTOCOL_BINARY
+        spec - Capteur
+        seq - Séquence (version de l'instantané publié)
+        timestamp - Horodatage de la publication
+        value - Nouvelle valeur
+    Returns: str ('Delta:<seq>:<capteur>:<valeur>', JSON) ou bytes (binaire)
+    """
+    value = reading_value(spec, value)
+    if protocol == PROTOCOL_BINARY:
+        return BINARY_RECORD.pack(spec.sensor_id, seq & 0xFFFFFFFF, timestamp,
+                                  float('nan') if value is None else value)
+    if protocol == PROTOCOL_JSON:
+        return json.dumps(delta_fields(spec, seq, timestamp, value), separators=(',', ':'), ensure_ascii=False)
+    return f"Delta:{seq}:{spec.name}:{0 if value is None else value}"
+
+def encode_reading(protocol: str, spec: SensorSpec, snapshot: SensorSnapshot, value):
+    """
+    Encode la réponse 'get-<capteur>' dans le format négocié
+    Args:
+        protocol - PROTOCOL_TEXT, PROTOCOL_JSON ou PROTOCOL_BINARY
+        spec - Capteur
+        snapshot - Instantané (séquence et horodatage)
+        value - Valeur à envoyer (une validation consommée peut différer de l'instantané)
+    Returns: str (texte, JSON) ou bytes (binaire)
+    """
+    if protocol == PROTOCOL_TEXT:
+        return format_sensor_message(spec, value)
+    if protocol == PROTOCOL_JSON and spec.sensor_id in snapshot.stale:
+        return json.dumps(delta_fields(spec, snapshot.version, snapshot.timestamp, reading_value(spec, value), True),
+                          separators=(',', ':'), ensure_ascii=False)
+    return encode_delta(protocol, spec, snapshot.version, snapshot.timestamp, value)
+
+def encode_all_mesure(protocol: str, snapshot: SensorSnapshot, validation) -> Any:
+    """
+    Encode la réponse 'all-mesure' en JSON ou en binaire (une suite
+    d'enregistrements BINARY_RECORD, un par capteur)
+    Args:
+        validation - Validation consommée pour ce client, ou None
+    """
+    values = list(snapshot.values)
+    values[VALIDATION] = validation
+    if protocol == PROTOCOL_BINARY:
+        return b"".join(encode_reading(protocol, spec, snapshot, values[spec.sensor_id]) for spec in SENSOR_REGISTRY)
+    return json.dumps({"type": "all-mesure", "seq": snapshot.version, "ts": snapshot.timestamp,
+                       "values": {spec.name: reading_value(spec, values[spec.sensor_id]) for spec in SENSOR_REGISTRY},
+                       "stale": [SENSOR_REGISTRY.specs[sensor_id].name for sensor_id in sorted(snapshot.stale)]},
+                      separators=(',', ':'), ensure_ascii=False)
+
+def select_subprotocol(connection, offered):
+    """
+    Choisit le sous-protocole 'medisense.<format>' proposé par le client;
+    sans proposition reconnue, la connexion continue en protocole texte
+    """
+    for subprotocol in offered:
+        if subprotocol in SUBPROTOCOLS:
+            return subprotocol
+    return None
+
+class ResponseCache:
+    """
+    Réponses pré-formatées partagées entre clients, valables pour une version
+    d'instantané: toute publication (mise à jour, reset, validation consommée)
+    change la version et invalide donc le cache.
+    Utilisé uniquement depuis la boucle du serveur WebSocket.
+    """
+
+    def __init__(self):
+        self.version = -1
+        self.entries: Dict[Any, str] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, snapshot: SensorSnapshot, key, render) -> str:
+        """
+        Retourne la réponse en cache pour (version, clé) ou la formate
+        Args:
+            snapshot - Instantané lu par la commande
+            key - Clé de la réponse (commande et paramètres)
+            render - Fonction snapshot -> réponse
+        """
+        if snapshot.version != self.version:
+            if snapshot.version < self.version:
+                # Instantané plus ancien que le cache: ne pas le polluer
+                self.misses += 1
+                return render(snapshot)
+            self.version = snapshot.version
+            self.entries = {}
+        response = self.entries.get(key)
+        if response is None:
+            self.misses += 1
+            response = self.entries[key] = render(snapshot)
+        else:
+            self.hits += 1
+        return response
+
+    def summary(self) -> str:
+        return f"version={self.version},hits={self.hits},misses={self.misses}"
+
+# Cache des réponses aux commandes de lecture
+response_cache = ResponseCache()
+
+def notify_subscribers(snapshot: SensorSnapshot, changes: tuple):
+    """
+    Signale aux abonnés les capteurs modifiés par une publication.
+    Appelable depuis n'importe quel thread: l'envoi est posté sur la boucle
+    du serveur WebSocket.
+    Args:
+        snapshot - Instantané publié
+        changes - Delta de la publication ((sensor_id, valeur), ...)
+    """
+    loop = websocket_loop
+    if loop is None or not subscribers or not changes:
+        return
+    
+    try:
+        loop.call_soon_threadsafe(push_sensor_updates, snapshot, [sensor_id for sensor_id, _ in changes])
+    except RuntimeError:
+        # Boucle arrêtée
+        pass
+
+class BroadcastStats:
+    """Mesures de coût des diffusions (nombre, durée, destinataires)"""
+    __slots__ = ('count', 'recipients', 'total_seconds', 'max_seconds', 'last_seconds')
+
+    def __init__(self):
+        self.count = 0
+        self.recipients = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.last_seconds = 0.0
+
+    def record(self, recipients: int, seconds: float):
+        self.count += 1
+        self.recipients += recipients
+        self.total_seconds += seconds
+        self.last_seconds = seconds
+        if seconds > self.max_seconds:
+            self.max_seconds = seconds
+
+    def summary(self) -> str:
+        avg_us = self.total_seconds / self.count * 1e6 if self.count else 0.0
+        per_client_us = self.total_seconds / self.recipients * 1e6 if self.recipients else 0.0
+        return (f"count={self.count},recipients={self.recipients},avg_us={avg_us:.1f},"
+                f"per_client_us={per_client_us:.2f},max_us={self.max_seconds * 1e6:.1f},"
+                f"last_us={self.last_seconds * 1e6:.1f}")
+
+# Statistiques de diffusion (exposées par la commande 'broadcast-stats')
+broadcast_stats = BroadcastStats()
+
+class ClientSession:
+    """
+    Connexion WebSocket et sa file d'envoi bornée, vidée par une tâche dédiée.
+    Les mises à jour de capteurs en excès sont fusionnées (seule la dernière
+    valeur de chaque capteur est conservée); les validations et les réponses
+    aux commandes ne sont jamais abandonnées.
+    """
+
+    # Nature des entrées de la file
+    RESPONSE, UPDATE, CRITICAL = range(3)
+
+    def __init__(self, websocket, address: str, max_queue: int = CLIENT_QUEUE_SIZE,
+                 protocol: str = PROTOCOL_TEXT):
+        self.websocket = websocket
+        self.address = address
+        # Format des mesures envoyées (texte, JSON ou binaire)
+        self.protocol = protocol
+        self.max_queue = max_queue
+        self.queue = deque()
+        self.pending_updates = 0
+        self.pending_responses = 0
+        self.sent = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self.closed = False
+        self._ready = asyncio.Event()
+        self._space = asyncio.Event()
+        self._writer = asyncio.ensure_future(self._write_loop())
+
+    @property
+    def depth(self) -> int:
+        return len(self.queue)
+
+    def _append(self, kind: int, sensor_id: Optional[int], message):
+        self.queue.append((kind, sensor_id, message))
+        if len(self.queue) > self.max_depth:
+            self.max_depth = len(self.queue)
+        self._ready.set()
+
+    async def send_response(self, message):
+        """
+        Met en file une réponse; attend si le client ne lit plus ses réponses
+        (le traitement de ses commandes est alors suspendu, pas celui des autres)
+        """
+        while self.pending_responses >= self.max_queue and not self.closed:
+            self._space.clear()
+            await self._space.wait()
+        if self.closed:
+            return
+        self.pending_responses += 1
+        self._append(self.RESPONSE, None, message)
+
+    def offer_update(self, sensor_id: int, message, critical: bool = False):
+        """
+        Met en file une mise à jour sans jamais bloquer l'appelant
+        Args:
+            sensor_id - Capteur concerné
+            message - Message déjà formaté (partagé entre clients)
+            critical - True pour les événements à ne jamais abandonner (validation)
+        """
+        if self.closed:
+            return
+        if critical:
+            self._append(self.CRITICAL, sensor_id, message)
+            return
+        if self.pending_updates >= self.max_queue:
+            self._conflate()
+        if self.pending_updates >= self.max_queue:
+            self._drop_oldest_update()
+        self.pending_updates += 1
+        self._append(self.UPDATE, sensor_id, message)
+
+    def _conflate(self):
+        """Ne garde que la mise à jour la plus récente de chaque capteur"""
+        seen = set()
+        kept = deque()
+        for entry in reversed(self.queue):
+            kind, sensor_id, _ = entry
+            if kind == self.UPDATE:
+                if sensor_id in seen:
+                    self.dropped += 1
+                    self.pending_updates -= 1
+                    continue
+                seen.add(sensor_id)
+            kept.appendleft(entry)
+        self.queue = kept
+
+    def _drop_oldest_update(self):
+        for index, (kind, _, _) in enumerate(self.queue):
+            if kind == self.UPDATE:
+                del self.queue[index]
+                self.dropped += 1
+                self.pending_updates -= 1
+                return
+
+    async def _write_loop(self):
+        """Envoie les entrées de la file dans l'ordre (avec contre-pression)"""
+        try:
+            while True:
+                while not self.queue:
+                    self._ready.clear()
+                    await self._ready.wait()
+                kind, _, message = self.queue.popleft()
+                if kind == self.UPDATE:
+                    self.pending_updates -= 1
+                elif kind == self.RESPONSE:
+                    self.pending_responses -= 1
+                    self._space.set()
+                await self.websocket.send(message)
+                self.sent += 1
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"❌ Erreur envoi vers {self.address}: {e}")
+        finally:
+            self.closed = True
+            self.queue.clear()
+            self._space.set()
+
+    def close(self):
+        """Arrête la tâche d'envoi"""
+        self.closed = True
+        self._writer.cancel()
+
+    def summary(self) -> str:
+        return (f"{self.address}:depth={self.depth},max_depth={self.max_depth},"
+                f"dropped={self.dropped},sent={self.sent}")
+
+def broadcast_message(sessions, sensor_id: int, message, critical: bool = False):
+    """
+    Diffuse un message déjà formaté (une seule sérialisation) à un groupe de
+    sessions: il est déposé dans la file bornée de chacune, sans attendre les
+    clients lents. Doit être appelé depuis la boucle du serveur WebSocket.
+    Args:
+        sessions - Sessions destinataires
+        sensor_id - Capteur concerné (clé de fusion)
+        message - Message (str: trame texte, bytes: trame binaire)
+        critical - True si le message ne doit jamais être abandonné
+    """
+    if not sessions:
+        return
+    start = time.perf_counter()
+    for session in sessions:
+        session.offer_update(sensor_id, message, critical)
+    broadcast_stats.record(len(sessions), time.perf_counter() - start)
+
+# Dernière séquence poussée par capteur: les publications de threads
+# concurrents peuvent être postées sur la boucle dans le désordre
+pushed_versions = [0] * len(SENSOR_REGISTRY)
+
+def push_sensor_updates(snapshot: SensorSnapshot, changed: list):
+    """
+    Diffuse les deltas aux abonnés (exécuté sur la boucle): chaque message est
+    encodé une fois par format et partagé par tous les clients du groupe
+    """
+    for sensor_id in changed:
+        if snapshot.version <= pushed_versions[sensor_id]:
+            continue
+        pushed_versions[sensor_id] = snapshot.version
+        spec = SENSOR_REGISTRY.specs[sensor_id]
+        value = snapshot[sensor_id]
+        if spec.is_code and value is not None:
+            push_validation(snapshot, spec)
+            continue
+        for protocol in PROTOCOLS:
+            group = subscription_groups[sensor_id, protocol]
+            if group:
+                broadcast_message(group, sensor_id, encode_delta(protocol, spec, snapshot.version, snapshot.timestamp, value), spec.is_code)
+
+def push_validation(snapshot: SensorSnapshot, spec: SensorSpec, recipient: Optional[ClientSession] = None):
+    """
+    Pousse un code de validation à un seul abonné (par défaut le premier du
+    capteur), après l'avoir consommé (compare-and-swap, comme
+    'get-validation'): sans abonné, le code reste en attente pour le
+    prochain abonnement ou 'get-validation' / 'all-mesure'. La remise à zéro
+    qui suit est ensuite poussée à tous.
+    """
+    if recipient is None:
+        recipient = next((session for protocol in PROTOCOLS
+                          for session in subscription_groups[spec.sensor_id, protocol]), None)
+    if recipient is None:
+        return
+    value = consume_validation(snapshot)
+    if value is None:
+        # Déjà consommé par une requête
+        return
+    message = encode_delta(recipient.protocol, spec, snapshot.version, snapshot.timestamp, value)
+    broadcast_message((recipient,), spec.sensor_id, message, critical=True)
+
+def subscribe_client(session: ClientSession, sensor_ids: frozenset):
+    """Abonne un client aux capteurs donnés (remplace un abonnement existant)"""
+    unsubscribe_client(session)
+    subscribers[session] = sensor_ids
+    for sensor_id in sensor_ids:
+        subscription_groups[sensor_id, session.protocol].add(session)
+
+def unsubscribe_client(session: ClientSession):
+    """Retire un client de tous les groupes d'abonnement"""
+    for sensor_id in subscribers.pop(session, ()):
+        subscription_groups[sensor_id, session.protocol].discard(session)
 
-def parse_sensor_data(raw_data: str, port_name: str) -> tuple:
+class LatencyHistogram:
     """
-    Parse les données reçues d'un capteur selon le format préfixe:valeur
-    Args: 
-        raw_data - Données brutes reçues
-        port_name - Nom du port source
-    Returns: (sensor_type, value, success)
+    Histogramme de latences à seaux logarithmiques (puissances de 2 en
+    microsecondes): enregistrement O(1), mémoire fixe, percentiles approchés
     """
-    try:
-        # Nettoyer les données
-        data = raw_data.strip()
-        
-        if not data:
-            return None, None, False
-        
-        # Vérifier le format préfixe:valeur
-        if ':' not in data:
-            logger.debug(f"📥 {port_name}: Format non reconnu: '{data}'")
-            return None, None, False
-        
-        # Séparer préfixe et valeur
-        parts = data.split(':', 1)  # Split seulement sur le premier ':'
-        if len(parts) != 2:
-            logger.debug(f"📥 {port_name}: Format invalide: '{data}'")
-            return None, None, False
-        
-        sensor_type = parts[0].lower().strip()
-        value_str = parts[1].strip()
-        
-        # Vérifier si le type de capteur est connu
-        if sensor_type not in SENSOR_CONFIG:
-            # Vérifier les aliases
-            found = False
-            for main_type, config in SENSOR_CONFIG.items():
-                if sensor_type in config.get('aliases', []):
-                    sensor_type = main_type
-                    found = True
-                    break
-            
-            if not found:
-                logger.debug(f"📥 {port_name}: Type capteur inconnu: '{sensor_type}'")
-                return None, None, False
-        
-        # Convertir la valeur selon le type
-        config = SENSOR_CONFIG[sensor_type]
-        
-        try:
-            if sensor_type in ['validation', 'card']:
-                # Pour la validation, convertir en entier
-                value = int(float(value_str))  # float puis int pour gérer "310502.0"
-            else:
-                # Pour les autres, convertir en float
-                value = float(value_str)
-                # Appliquer la précision
-                value = round(value, config.get('precision', 1))
-        
-        except ValueError as e:
-            logger.warning(f"❌ {port_name}: Impossible de convertir '{value_str}': {e}")
-            return None, None, False
-        
-        logger.debug(f"📊 {port_name}: {sensor_type} = {value}")
-        return sensor_type, value, True
-        
-    except Exception as e:
-        logger.error(f"❌ Erreur parsing données de {port_name}: {e}")
-        return None, None, False
+    __slots__ = ('buckets', 'count', 'total_seconds', 'max_seconds')
 
-def validate_sensor_value(sensor_type: str, value) -> bool:
+    # Seau i: [2^(i-1), 2^i[ µs (seau 0: < 1 µs), dernier seau: au-delà de ~67 s
+    BUCKETS = 27
+
+    def __init__(self):
+        self.buckets = [0] * self.BUCKETS
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def record(self, seconds: float):
+        index = int(seconds * 1e6).bit_length()
+        self.buckets[min(index, self.BUCKETS - 1)] += 1
+        self.count += 1
+        self.total_seconds += seconds
+        if seconds > self.max_seconds:
+            self.max_seconds = seconds
+
+    def percentile(self, fraction: float) -> float:
+        """Borne haute (µs) du seau contenant le percentile demandé"""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(float(1 << index), self.max_seconds * 1e6)
+        return self.max_seconds * 1e6
+
+    def summary(self) -> str:
+        mean_us = self.total_seconds / self.count * 1e6 if self.count else 0.0
+        return (f"n={self.count},mean_us={mean_us:.1f},p50_us={self.percentile(0.5):.0f},"
+                f"p99_us={self.percentile(0.99):.0f},max_us={self.max_seconds * 1e6:.1f}")
+
+class CommandMetrics:
+    """Mesures d'une commande: histogramme de temps de service et erreurs"""
+    __slots__ = ('latency', 'errors')
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.errors = 0
+
+    def summary(self) -> str:
+        return f"{self.latency.summary()},errors={self.errors}"
+
+class CommandContext:
+    """Contexte d'exécution d'une commande WebSocket"""
+    __slots__ = ('session', 'snapshot')
+
+    def __init__(self, session: 'ClientSession', snapshot: SensorSnapshot):
+        self.session = session
+        # Instantané lu par la commande (lecture sans verrou)
+        self.snapshot = snapshot
+
+# Table de dispatch: nom de commande -> (gestionnaire, mesures)
+COMMANDS: Dict[str, tuple] = {}
+
+# Commandes inconnues reçues
+unknown_commands = 0
+
+def command(name: str):
     """
-    Valide une valeur de capteur selon sa configuration
+    Décorateur enregistrant un gestionnaire de commande WebSocket.
+    Le gestionnaire reçoit (ctx, args) où args est la liste des paramètres
+    séparés par des espaces, et retourne la réponse à envoyer.
+    """
+    def register(handler):
+        COMMANDS[name] = (handler, CommandMetrics())
+        return handler
+    return register
+
+def dispatch_command(ctx: CommandContext, message: str) -> str:
+    """
+    Exécute une commande (dispatch O(1)) et mesure son temps de service
     Args:
-        sensor_type - Type du capteur
-        value - Valeur à valider
-    Returns: True si valide, False sinon
+        ctx - Contexte (session, instantané)
+        message - Commande reçue, ex: 'get-poid' ou 'subscribe poids,taille'
+    Returns: Réponse à envoyer au client
     """
-    if sensor_type not in SENSOR_CONFIG:
-        return False
+    global unknown_commands
+    name, _, arguments = message.partition(' ')
+    entry = COMMANDS.get(name)
     
-    config = SENSOR_CONFIG[sensor_type]
+    if entry is None:
+        unknown_commands += 1
+        logger.warning(f"⚠️ Commande inconnue de {ctx.session.address}: {message}")
+        return f"Commande inconnue: {message}"
     
+    handler, metrics = entry
+    start = time.perf_counter()
     try:
-        if sensor_type in ['validation', 'card']:
-            # Validation spéciale pour les codes
-            expected = config.get('expected_value', refValidateCard)
-            return value == expected
-        else:
-            # Validation par plage pour les autres capteurs
-            min_val = config.get('min_value', float('-inf'))
-            max_val = config.get('max_value', float('inf'))
-            return min_val <= value <= max_val
-    
+        return handler(ctx, arguments.split())
     except Exception as e:
-        logger.error(f"❌ Erreur validation {sensor_type}: {e}")
-        return False
+        metrics.errors += 1
+        logger.error(f"❌ Erreur traitement message de {ctx.session.address}: {e}")
+        return f"Erreur serveur: {str(e)}"
+    finally:
+        metrics.latency.record(time.perf_counter() - start)
 
-def update_sensor_data(sensor_type: str, value, port_name: str):
+# Nombre max de commandes dans une trame groupée ('get-poid;get-taille')
+MAX_BATCH_COMMANDS = int(os.environ.get('MEDISENSE_MAX_BATCH', '32'))
+
+def dispatch_batch(ctx: CommandContext, message: str) -> str:
     """
-    Met à jour les données globales des capteurs
+    Exécute une trame de commandes séparées par des retours à la ligne ou des
+    ';', toutes sur le même instantané (réponses cohérentes entre elles)
     Args:
-        sensor_type - Type du capteur
-        value - Nouvelle valeur
-        port_name - Port source
+        ctx - Contexte (session, instantané commun)
+        message - Trame reçue, ex: 'get-poid;get-temperature;get-taille'
+    Returns: Réponses dans l'ordre des commandes, séparées par des retours à la
+             ligne; en binaire, les enregistrements consécutifs sont concaténés et
+             une liste de trames est retournée si texte et binaire alternent
     """
-    global sensor_data
+    commands = [part.strip() for part in message.replace(';', '\n').split('\n')]
+    commands = [part for part in commands if part]
     
-    if not validate_sensor_value(sensor_type, value):
-        logger.warning(f"⚠️ {port_name}: Valeur {sensor_type}={value} hors limites")
-        return False
+    if len(commands) > MAX_BATCH_COMMANDS:
+        return f"Batch:ERREUR:{len(commands)} commandes (max {MAX_BATCH_COMMANDS})"
     
-    with data_lock:
-        # Mettre à jour la valeur principale
-        sensor_data[sensor_type] = value
-        
-        # Mettre à jour les aliases si nécessaire
-        config = SENSOR_CONFIG.get(sensor_type, {})
-        for alias in config.get('aliases', []):
-            if alias in sensor_data:
-                sensor_data[alias] = value
-        
-        # Log de mise à jour
-        unit = config.get('unit', '')
-        logger.info(f"📊 {sensor_type.capitalize()}: {value}{unit} (depuis {port_name})")
+    frames = []
+    for response in (dispatch_command(ctx, part) for part in commands):
+        if frames and type(frames[-1][0]) is type(response):
+            frames[-1].append(response)
+        else:
+            frames.append([response])
     
-    return True
+    frames = [b"".join(parts) if isinstance(parts[0], bytes) else "\n".join(parts) for parts in frames]
+    return frames[0] if len(frames) == 1 else frames
 
-def read_serial_data():
-    """Fonction principale qui lit en continu les données de tous les ports série"""
-    logger.info("🚀 Démarrage de la lecture des données série...")
+def command_metrics_summary() -> str:
+    """Résumé des mesures de toutes les commandes déjà exécutées"""
+    parts = [f"{name}:{metrics.summary()}" for name, (_, metrics) in COMMANDS.items() if metrics.latency.count]
+    parts.append(f"unknown:n={unknown_commands}")
+    return ";".join(parts)
+
+# Gestion des commandes (lecture sans verrou de l'instantané du contexte,
+# réponses mises en cache par version)
+
+def sensor_response(ctx: CommandContext, sensor_id: int, key: str):
+    """Réponse 'get-<capteur>' dans le format de la session (en cache par version)"""
+    spec = SENSOR_REGISTRY.specs[sensor_id]
+    protocol = ctx.session.protocol
+    if protocol != PROTOCOL_TEXT:
+        key = (key, protocol)
+    return response_cache.get(ctx.snapshot, key, lambda snapshot: encode_reading(protocol, spec, snapshot, snapshot[sensor_id]))
+
+@command("get-poid")
+def cmd_get_poid(ctx: CommandContext, args: list) -> str:
+    return sensor_response(ctx, POIDS, "get-poid")
+
+@command("get-temperature")
+def cmd_get_temperature(ctx: CommandContext, args: list) -> str:
+    return sensor_response(ctx, TEMPERATURE, "get-temperature")
+
+@command("get-validation")
+def cmd_get_validation(ctx: CommandContext, args: list) -> str:
+    # Réinitialisée après envoi (compare-and-swap)
+    value = consume_validation(ctx.snapshot)
+    if ctx.session.protocol != PROTOCOL_TEXT:
+        return encode_reading(ctx.session.protocol, SENSOR_REGISTRY.specs[VALIDATION], ctx.snapshot, value)
+    return f"Validation:{value}" if value is not None else "Validation:0"
+
+@command("get-taille")
+def cmd_get_taille(ctx: CommandContext, args: list) -> str:
+    return sensor_response(ctx, TAILLE, "get-taille")
+
+@command("all-mesure")
+def cmd_all_mesure(ctx: CommandContext, args: list) -> str:
+    snapshot = ctx.snapshot
+    protocol = ctx.session.protocol
     
-    # Découvrir les ports disponibles
-    available_ports = discover_serial_ports()
+    if protocol != PROTOCOL_TEXT:
+        if snapshot[VALIDATION] != refValidateCard:
+            return response_cache.get(snapshot, ("all-mesure", protocol), lambda snapshot: encode_all_mesure(protocol, snapshot, None))
+        return encode_all_mesure(protocol, snapshot, consume_validation(snapshot))
     
-    if not available_ports:
-        logger.warning("⚠️ Aucun port série disponible! Démarrage en mode SIMULATION...")
-        run_simulation_mode()
-        return
+    if snapshot[VALIDATION] != refValidateCard:
+        # Pas de validation en attente: réponse complète en cache
+        return response_cache.get(snapshot, "all-mesure", lambda snapshot: render_all_mesure_prefix(snapshot) + "validation:0")
     
-    # Établir les connexions
-    connections = connect_to_ports(available_ports)
+    # Validation (réinitialisée après envoi, un seul client la reçoit)
+    prefix = response_cache.get(snapshot, "all-mesure-prefix", render_all_mesure_prefix)
+    valid_val = consume_validation(snapshot)
+    return prefix + (f"validation:{valid_val}" if valid_val is not None else "validation:0")
+
+@command("hello")
+def cmd_hello(ctx: CommandContext, args: list) -> str:
+    # Choix du format des mesures: 'hello text', 'hello json' ou 'hello bin'
+    session = ctx.session
+    if args:
+        protocol = args[0].lower()
+        if protocol not in PROTOCOLS:
+            return f"Hello:ERREUR:format inconnu {args[0]} (attendu {','.join(PROTOCOLS)})"
+        if protocol != session.protocol:
+            # Les groupes d'abonnement dépendent du format
+            sensor_ids = subscribers.get(session)
+            unsubscribe_client(session)
+            session.protocol = protocol
+            if sensor_ids is not None:
+                subscribe_client(session, sensor_ids)
+            logger.info(f"🗣️ {session.address} utilise le protocole {protocol}")
+    return f"Hello:OK:{session.protocol}"
+
+@command("resume")
+def cmd_resume(ctx: CommandContext, args: list):
+    # Reprise après reconnexion: deltas publiés après la séquence donnée, ou
+    # état complet si l'historique ne remonte plus jusque-là
+    # (s'abonner avant pour ne rien manquer entre les deux)
+    if len(args) != 1 or not args[0].isdigit():
+        return "Resume:ERREUR:usage resume <seq>"
     
-    if not connections:
-        logger.warning("⚠️ Aucune connexion établie! Démarrage en mode SIMULATION...")
-        run_simulation_mode()
-        return
+    protocol = ctx.session.protocol
+    specs = SENSOR_REGISTRY.specs
+    entries = replay_buffer.since(int(args[0]))
+    full = entries is None
+    if full:
+        # Sans les codes de validation (consommés par 'get-validation')
+        snapshot = ctx.snapshot
+        entries = [(snapshot.version, snapshot.timestamp,
+                    tuple((spec.sensor_id, snapshot[spec.sensor_id]) for spec in specs if not spec.is_code))]
     
-    logger.info(f"✅ Lecture démarrée sur {len(connections)} port(s)")
+    if protocol == PROTOCOL_JSON:
+        deltas = [delta_fields(specs[sensor_id], seq, timestamp, reading_value(specs[sensor_id], value))
+                  for seq, timestamp, changes in entries for sensor_id, value in changes]
+        return json.dumps({"type": "resume", "full": full, "seq": ctx.snapshot.version, "deltas": deltas},
+                          separators=(',', ':'), ensure_ascii=False)
     
-    # Boucle principale de lecture
-    while not shutdown_event.is_set():
-        try:
-            data_received = False
-            
-            # Lire chaque port connecté
-            for port_name, conn_info in connections.items():
-                ser = conn_info['serial']
-                
-                try:
-                    if not ser.is_open:
-                        continue
-                    
-                    # Lire les données disponibles
-                    if ser.in_waiting > 0:
-                        raw_data = ser.readline().decode('utf-8', errors='ignore').strip()
-                        
-                        if raw_data:
-                            # Parser les données
-                            sensor_type, value, success = parse_sensor_data(raw_data, port_name)
-                            
-                            if success and sensor_type and value is not None:
-                                # Mettre à jour les données
-                                if update_sensor_data(sensor_type, value, port_name):
-                                    data_received = True
-                                    conn_info['last_data'] = time.time()
-                                    conn_info['error_count'] = 0
-                            else:
-                                logger.debug(f"📥 {port_name}: Données ignorées: '{raw_data}'")
-                
-                except serial.SerialException as e:
-                    conn_info['error_count'] += 1
-                    logger.error(f"❌ Erreur lecture {port_name}: {e}")
-                    
-                    # Reconnecter si trop d'erreurs
-                    if conn_info['error_count'] > 5:
-                        logger.warning(f"🔄 Tentative de reconnexion {port_name}...")
-                        try:
-                            ser.close()
-                            time.sleep(1)
-                            new_ser = serial.Serial(conn_info['port_path'], conn_info['baudrate'], timeout=1)
-                            conn_info['serial'] = new_ser
-                            conn_info['error_count'] = 0
-                            logger.info(f"✅ {port_name} reconnecté")
-                        except Exception as reconnect_error:
-                            logger.error(f"❌ Échec reconnexion {port_name}: {reconnect_error}")
-                
-                except Exception as e:
-                    logger.error(f"❌ Erreur inattendue {port_name}: {e}")
-            
-            # Pause adaptative
-            time.sleep(0.05 if data_received else 0.2)
-            
-        except Exception as e:
-            logger.error(f"❌ Erreur critique dans la boucle de lecture: {e}")
-            time.sleep(1)
+    deltas = [encode_delta(protocol, specs[sensor_id], seq, timestamp, value)
+              for seq, timestamp, changes in entries for sensor_id, value in changes]
+    if protocol == PROTOCOL_BINARY:
+        return b"".join(deltas)
+    header = f"Resume:FULL:{ctx.snapshot.version}" if full else f"Resume:OK:{len(deltas)}"
+    return "\n".join([header] + deltas)
+
+@command("get-history")
+def cmd_get_history(ctx: CommandContext, args: list):
+    # Dernières lectures d'un capteur: 'get-history poids 20'
+    spec = SENSOR_REGISTRY.resolve(args[0].lower()) if args else None
+    if spec is None or len(args) > 2 or (len(args) == 2 and not args[1].isdigit()):
+        return "History:ERREUR:usage get-history <capteur> <n>"
     
-    # Fermeture propre des connexions
-    logger.info("🔌 Fermeture des connexions série...")
-    for port_name, conn_info in connections.items():
-        try:
-            if conn_info['serial'].is_open:
-                conn_info['serial'].close()
-                logger.info(f"🔌 {port_name} fermé")
-        except Exception as e:
-            logger.error(f"❌ Erreur fermeture {port_name}: {e}")
+    points = sensor_history[spec.sensor_id].last(int(args[1]) if len(args) == 2 else 10)
+    # Horodatages monotones convertis en heure murale
+    offset = time.time() - time.monotonic()
+    protocol = ctx.session.protocol
+    
+    if protocol == PROTOCOL_BINARY:
+        # Enregistrements BINARY_RECORD (séquence 0: hors flux de deltas)
+        return b"".join(BINARY_RECORD.pack(spec.sensor_id, 0, timestamp + offset, value)
+                        for timestamp, value in points)
+    if protocol == PROTOCOL_JSON:
+        return json.dumps({"type": "history", "sensor": spec.name, "unit": spec.unit,
+                           "points": [[round(timestamp + offset, 3), value] for timestamp, value in points]},
+                          separators=(',', ':'), ensure_ascii=False)
+    return f"History:{spec.name}:{len(points)}:" + ",".join(f"{timestamp + offset:.3f}={value:.10g}" for timestamp, value in points)
 
-def run_simulation_mode():
-    """Mode simulation avec données fictives"""
-    logger.info("🎭 Mode SIMULATION activé")
+# Enregistrement binaire d'un agrégat: sensor_id (u8), début d'intervalle
+# (f64, secondes epoch), nombre (u32), min, max, moyenne (f64)
+ROLLUP_RECORD = struct.Struct('<BdIddd')
+
+def parse_duration(text: str) -> Optional[float]:
+    """Durée en secondes ('90', '30s', '15m', '2h', '1d'), ou None si invalide"""
+    units = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+    factor = units.get(text[-1:].lower())
+    number = text[:-1] if factor else text
+    factor = factor or 1
+    return float(number) * factor if number.isdigit() and int(number) > 0 else None
+
+@command("get-rollup")
+def cmd_get_rollup(ctx: CommandContext, args: list):
+    # Agrégats pour les courbes: 'get-rollup poids 1m 1h'
+    if len(args) != 3:
+        return f"Rollup:ERREUR:usage get-rollup <capteur> <{'|'.join(ROLLUP_TIERS)}> <durée>"
     
-    counter = 0
-    last_validation_time = 0
+    spec = SENSOR_REGISTRY.resolve(args[0].lower())
+    if spec is None or sensor_rollups[spec.sensor_id] is None:
+        return f"Rollup:ERREUR:capteur sans agrégats {args[0]}"
+    tier = sensor_rollups[spec.sensor_id].tiers.get(args[1].lower())
+    if tier is None:
+        return f"Rollup:ERREUR:résolution inconnue {args[1]} (attendu {','.join(ROLLUP_TIERS)})"
+    span = parse_duration(args[2])
+    if span is None:
+        return f"Rollup:ERREUR:durée invalide {args[2]}"
     
-    while not shutdown_event.is_set():
-        try:
-            current_time = time.time()
-            counter += 1
-            
-            with data_lock:
-                # Simulation de données réalistes
-                sensor_data['poids'] = round(70.5 + (counter % 20) * 0.1, 1)
-                sensor_data['temperature'] = round(36.5 + (counter % 8) * 0.05, 1) 
-                sensor_data['temp'] = sensor_data['temperature']  # Alias
-                
-                # Validation toutes les 30 secondes
-                if current_time - last_validation_time > 30:
-                    sensor_data['validation'] = refValidateCard
-                    sensor_data['card'] = refValidateCard  # Alias
-                    last_validation_time = current_time
-                    logger.info(f"✅ [SIMULATION] Validation générée: {refValidateCard}")
-            
-            # Log périodique
-            if counter % 10 == 0:
-                with data_lock:
-                    logger.info(f"📊 [SIMULATION] Poids: {sensor_data['poids']}kg, "
-                              f"Température: {sensor_data['temperature']}°C")
-            
-            time.sleep(2)
-            
-        except Exception as e:
-            logger.error(f"❌ Erreur en mode simulation: {e}")
-            time.sleep(1)
+    buckets = tier.query(span, time.time())
+    protocol = ctx.session.protocol
+    
+    if protocol == PROTOCOL_BINARY:
+        return b"".join(ROLLUP_RECORD.pack(spec.sensor_id, *bucket) for bucket in buckets)
+    if protocol == PROTOCOL_JSON:
+        return json.dumps({"type": "rollup", "sensor": spec.name, "unit": spec.unit, "resolution": tier.resolution,
+                           "buckets": [list(bucket) for bucket in buckets]},
+                          separators=(',', ':'), ensure_ascii=False)
+    return (f"Rollup:{spec.name}:{args[1].lower()}:{len(buckets)}:" +
+            ",".join(f"{start}={count}/{minimum:.10g}/{maximum:.10g}/{mean:.10g}"
+                     for start, count, minimum, maximum, mean in buckets))
+
+# Nombre max de lectures renvoyées par 'get-archive' (les plus récentes)
+ARCHIVE_MAX_POINTS = 10000
+
+@command("get-archive")
+def cmd_get_archive(ctx: CommandContext, args: list):
+    # Lectures de l'historique compressé sur une durée: 'get-archive poids 2d'
+    if compressed_history is None:
+        return "Archive:ERREUR:historique compressé désactivé (MEDISENSE_COMPRESSED_HISTORY=1)"
+    spec = SENSOR_REGISTRY.resolve(args[0].lower()) if args else None
+    span = parse_duration(args[1]) if len(args) == 2 else None
+    if spec is None or span is None:
+        return "Archive:ERREUR:usage get-archive <capteur> <durée>"
+    
+    # Décodage au fil de la lecture, seules les plus récentes sont gardées
+    start = int((time.time() - span) * 1000)
+    points = deque(compressed_history[spec.sensor_id].query(start), maxlen=ARCHIVE_MAX_POINTS)
+    protocol = ctx.session.protocol
+    
+    if protocol == PROTOCOL_BINARY:
+        return b"".join(BINARY_RECORD.pack(spec.sensor_id, 0, timestamp / 1000, value) for timestamp, value in points)
+    if protocol == PROTOCOL_JSON:
+        return json.dumps({"type": "archive", "sensor": spec.name, "unit": spec.unit,
+                           "points": [[timestamp / 1000, value] for timestamp, value in points]},
+                          separators=(',', ':'), ensure_ascii=False)
+    return f"Archive:{spec.name}:{len(points)}:" + ",".join(f"{timestamp / 1000:.3f}={value:.10g}" for timestamp, value in points)
+
+@command("get-state")
+def cmd_get_state(ctx: CommandContext, args: list):
+    # Fraîcheur des valeurs (restaurées au démarrage) et ports connus
+    snapshot = ctx.snapshot
+    stale = [SENSOR_REGISTRY.specs[sensor_id].name for sensor_id in sorted(snapshot.stale)]
+    ports = {port: info['sensor'] for port, info in list(port_map.items())}
+    if ctx.session.protocol == PROTOCOL_JSON:
+        return json.dumps({"type": "state", "seq": snapshot.version, "restored_at": restored_at or None,
+                           "stale": stale, "ports": ports}, separators=(',', ':'), ensure_ascii=False)
+    return (f"State:version={snapshot.version}:restored={restored_at:.3f}:stale={','.join(stale)}:"
+            f"ports={','.join(f'{port}={sensor}' for port, sensor in ports.items())}")
+
+@command("reset-data")
+def cmd_reset_data(ctx: CommandContext, args: list) -> str:
+    publish_sensor_values({spec.sensor_id: None for spec in SENSOR_REGISTRY})
+    logger.info(f"🔄 Données réinitialisées par {ctx.session.address}")
+    return "Reset:OK"
+
+@command("ping")
+def cmd_ping(ctx: CommandContext, args: list) -> str:
+    return "pong"
+
+@command("status")
+def cmd_status(ctx: CommandContext, args: list) -> str:
+    clients = len(connected_clients)
+    return response_cache.get(ctx.snapshot, ("status", clients), lambda snapshot: f"Status:clients={clients},sensors={len(active_sensor_keys(snapshot))}")
+
+@command("get-sensors")
+def cmd_get_sensors(ctx: CommandContext, args: list) -> str:
+    # Liste tous les capteurs détectés
+    return response_cache.get(ctx.snapshot, "get-sensors", lambda snapshot: f"Sensors:{','.join(active_sensor_keys(snapshot))}")
+
+@command("subscribe")
+def cmd_subscribe(ctx: CommandContext, args: list) -> str:
+    # Mises à jour poussées dès qu'une valeur change
+    # (tous les capteurs, ou liste: 'subscribe poids,temperature')
+    names = ' '.join(args).replace(',', ' ').split()
+    specs = [SENSOR_REGISTRY.resolve(name.lower()) for name in names]
+    if None in specs:
+        unknown = [name for name, spec in zip(names, specs) if spec is None]
+        return f"Subscribe:ERREUR:capteur inconnu {','.join(unknown)}"
+    
+    specs = specs or list(SENSOR_REGISTRY)
+    subscribe_client(ctx.session, frozenset(spec.sensor_id for spec in specs))
+    logger.info(f"🔔 {ctx.session.address} abonné aux mises à jour ({', '.join(spec.name for spec in specs)})")
+    # Code lu pendant l'absence du client (exclu de 'resume'): remis à ce client
+    snapshot = current_snapshot
+    for spec in specs:
+        if spec.is_code and snapshot[spec.sensor_id] is not None:
+            push_validation(snapshot, spec, ctx.session)
+    return "Subscribe:OK" if not names else f"Subscribe:OK:{','.join(spec.name for spec in specs)}"
+
+@command("unsubscribe")
+def cmd_unsubscribe(ctx: CommandContext, args: list) -> str:
+    unsubscribe_client(ctx.session)
+    return "Unsubscribe:OK"
+
+@command("broadcast-stats")
+def cmd_broadcast_stats(ctx: CommandContext, args: list) -> str:
+    return f"Broadcast:{broadcast_stats.summary()}"
+
+@command("client-stats")
+def cmd_client_stats(ctx: CommandContext, args: list) -> str:
+    # Profondeur de file et abandons par client
+    return "Clients:" + ";".join(s.summary() for s in list(client_sessions.values()))
+
+@command("metrics")
+def cmd_metrics(ctx: CommandContext, args: list) -> str:
+    # Temps de service (p50/p99) et erreurs par commande
+    return f"Metrics:{command_metrics_summary()}"
 
 async def socket_server(websocket):
     """Fonction pour gérer les connexions WebSocket"""
@@ -429,108 +3452,37 @@ async def socket_server(websocket):
     logger.info(f"🌐 Nouvelle connexion WebSocket de {client_address}")
     
     connected_clients.add(websocket)
+    session = ClientSession(websocket, client_address, protocol=SUBPROTOCOLS.get(websocket.subprotocol, PROTOCOL_TEXT))
+    client_sessions[websocket] = session
     
     try:
-        await websocket.send("Connection au serveur effectuée")
+        await session.send_response("Connection au serveur effectuée")
         logger.info(f"✅ Message de bienvenue envoyé à {client_address}")
 
         async for message in websocket:
             logger.debug(f"📨 Message de {client_address}: {message}")
             
-            try:
-                response = ""
-                
-                # Gestion des commandes
-                if message == "get-poid":
-                    with data_lock:
-                        value = sensor_data.get('poids')
-                        response = f"Poids:{value}" if value is not None and value > 0 else "Poids:0"
-
-                elif message == "get-temperature":
-                    with data_lock:
-                        value = sensor_data.get('temperature') or sensor_data.get('temp')
-                        response = f"Température:{value}" if value is not None and value > 0 else "Température:0"
-
-                elif message == "get-validation":
-                    with data_lock:
-                        value = sensor_data.get('validation') or sensor_data.get('card')
-                        if value == refValidateCard:
-                            response = f"Validation:{value}"
-                            # Réinitialiser après envoi
-                            sensor_data['validation'] = None
-                            sensor_data['card'] = None
-                        else:
-                            response = "Validation:0"
-
-                elif message == "get-taille":
-                    with data_lock:
-                        value = sensor_data.get('taille') or sensor_data.get('size')
-                        response = f"Taille:{value}" if value is not None and value > 0 else "Taille:0"
-
-                elif message == "reset-data":
-                    with data_lock:
-                        for key in sensor_data:
-                            sensor_data[key] = None
-                    response = "Reset:OK"
-                    logger.info(f"🔄 Données réinitialisées par {client_address}")
-
-                elif message == "all-mesure":
-                    mesures = []
-                    
-                    with data_lock:
-                        # Poids
-                        poids_val = sensor_data.get('poids')
-                        mesures.append(f"poids:{poids_val}" if poids_val is not None and poids_val > 0 else "poids:0")
-                        
-                        # Température
-                        temp_val = sensor_data.get('temperature') or sensor_data.get('temp')
-                        mesures.append(f"temperature:{temp_val}" if temp_val is not None and temp_val > 0 else "temperature:0")
-                        
-                        # Taille
-                        taille_val = sensor_data.get('taille') or sensor_data.get('size')
-                        mesures.append(f"taille:{taille_val}" if taille_val is not None and taille_val > 0 else "taille:0")
-                        
-                        # Validation
-                        valid_val = sensor_data.get('validation') or sensor_data.get('card')
-                        if valid_val == refValidateCard:
-                            mesures.append(f"validation:{valid_val}")
-                            # Réinitialiser après envoi
-                            sensor_data['validation'] = None
-                            sensor_data['card'] = None
-                        else:
-                            mesures.append("validation:0")
-                    
-                    response = "All-Mesure:" + ":".join(mesures)
-
-                elif message == "ping":
-                    response = "pong"
-
-                elif message == "status":
-                    with data_lock:
-                        response = f"Status:clients={len(connected_clients)},sensors={len([k for k, v in sensor_data.items() if v is not None])}"
-
-                elif message == "get-sensors":
-                    # Nouvelle commande pour lister tous les capteurs détectés
-                    with data_lock:
-                        active_sensors = [k for k, v in sensor_data.items() if v is not None]
-                        response = f"Sensors:{','.join(active_sensors)}"
-
-                else:
-                    response = f"Commande inconnue: {message}"
-                    logger.warning(f"⚠️ Commande inconnue de {client_address}: {message}")
-                
-                await websocket.send(response)
-                logger.debug(f"📤 Envoyé à {client_address}: {response}")
-                    
-            except websockets.exceptions.ConnectionClosed:
-                logger.info(f"🔌 Connexion fermée par {client_address}")
-                break
-            except Exception as e:
-                logger.error(f"❌ Erreur traitement message de {client_address}: {e}")
+            # Trame binaire: commande texte en UTF-8 (clients 'medisense.bin')
+            if isinstance(message, bytes):
                 try:
-                    await websocket.send(f"Erreur serveur: {str(e)}")
-                except:
-                    pass
+                    message = message.decode('utf-8')
+                except UnicodeDecodeError:
+                    await session.send_response(f"Commande inconnue: {message!r}")
+                    continue
+            
+            # Trame groupée: un seul instantané et une seule réponse
+            ctx = CommandContext(session, current_snapshot)
+            if ';' in message or '\n' in message:
+                response = dispatch_batch(ctx, message)
+            else:
+                response = dispatch_command(ctx, message)
+            
+            if isinstance(response, list):
+                for frame in response:
+                    await session.send_response(frame)
+            else:
+                await session.send_response(response)
+            logger.debug(f"📤 Envoyé à {client_address}: {response}")
                 
     except websockets.exceptions.ConnectionClosed:
         logger.info(f"🔌 Client {client_address} déconnecté")
@@ -538,11 +3490,16 @@ async def socket_server(websocket):
         logger.error(f"❌ Erreur dans socket_server pour {client_address}: {e}")
     finally:
         connected_clients.discard(websocket)
+        client_sessions.pop(websocket, None)
+        unsubscribe_client(session)
+        session.close()
         logger.info(f"🔚 Fin de session avec {client_address} (Clients restants: {len(connected_clients)})")
 
 async def start_websocket_server():
     """Démarrage du serveur WebSocket"""
+    global websocket_loop
     logger.info("🚀 Démarrage du serveur WebSocket sur 127.0.0.1:8765")
+    websocket_loop = asyncio.get_running_loop()
     try:
         async with websockets.serve(
             socket_server,
@@ -550,7 +3507,9 @@ async def start_websocket_server():
             8765,
             ping_interval=30,
             ping_timeout=10,
-            close_timeout=10
+            close_timeout=10,
+            subprotocols=list(SUBPROTOCOLS),
+            select_subprotocol=select_subprotocol
         ):
             logger.info("✅ Serveur WebSocket démarré avec succès")
             logger.info(f"📡 En écoute sur ws://127.0.0.1:8765")
@@ -559,6 +3518,8 @@ async def start_websocket_server():
     except Exception as e:
         logger.error(f"❌ Erreur serveur WebSocket: {e}")
         raise
+    finally:
+        websocket_loop = None
 
 def run_websocket_server():
     """Fonction pour exécuter le serveur WebSocket dans un thread"""
@@ -574,6 +3535,198 @@ def run_websocket_server():
         except:
             pass
 
+def on_serial_readable(loop: asyncio.AbstractEventLoop, port_name: str, conn_info: Dict[str, Any]):
+    """
+    Callback loop.add_reader: lit les octets disponibles sans bloquer la boucle
+    et traite chaque ligne complète (la fin de ligne partielle est conservée)
+    Args:
+        loop - Boucle asyncio
+        port_name - Nom du port
+        conn_info - Informations de connexion du port
+    """
+    try:
+        process_serial_port(port_name, conn_info)
+        if conn_info.pop('refingerprint', False):
+            loop.remove_reader(conn_info['fd'])
+            conn_info['serial'].close()
+            loop.create_task(refingerprint_port_async(loop, port_name, conn_info))
+    except serial.SerialException as e:
+        if port_unplugged(conn_info):
+            # Débranché: le détachement suit (hotplug)
+            loop.remove_reader(conn_info['fd'])
+            return
+        conn_info['error_count'] += 1
+        logger.error(f"❌ Erreur lecture {port_name}: {e}")
+        if conn_info['error_count'] > 5:
+            loop.remove_reader(conn_info['fd'])
+            loop.create_task(reconnect_serial_port_async(loop, port_name, conn_info))
+        return
+    except Exception as e:
+        logger.error(f"❌ Erreur inattendue {port_name}: {e}")
+
+def watch_serial_port(loop: asyncio.AbstractEventLoop, port_name: str, conn_info: Dict[str, Any]) -> bool:
+    """
+    Enregistre le descripteur d'un port sur la boucle asyncio
+    Returns: True si l'enregistrement a réussi
+    """
+    try:
+        conn_info['fd'] = conn_info['serial'].fileno()
+        loop.add_reader(conn_info['fd'], on_serial_readable, loop, port_name, conn_info)
+        return True
+    except (ValueError, OSError, NotImplementedError, serial.SerialException) as e:
+        logger.error(f"❌ {port_name}: surveillance asyncio impossible: {e}")
+        return False
+
+async def reconnect_serial_port_async(loop: asyncio.AbstractEventLoop, port_name: str, conn_info: Dict[str, Any]):
+    """Reconnecte un port perdu sans bloquer la boucle, puis le resurveille"""
+    while not shutdown_event.is_set():
+        logger.warning(f"🔄 Tentative de reconnexion {port_name}...")
+        try:
+            conn_info['serial'].close()
+            await asyncio.sleep(1)
+            conn_info['serial'] = serial.Serial(conn_info['port_path'], conn_info['baudrate'], timeout=1)
+            conn_info['error_count'] = 0
+            conn_info['framer'].clear()
+            logger.info(f"✅ {port_name} reconnecté")
+            if watch_serial_port(loop, port_name, conn_info):
+                return
+        except Exception as reconnect_error:
+            logger.error(f"❌ Échec reconnexion {port_name}: {reconnect_error}")
+
+async def refingerprint_port_async(loop: asyncio.AbstractEventLoop, port_name: str, conn_info: Dict[str, Any]):
+    """Réidentifie un port dans un exécuteur, puis resurveille son nouveau port série"""
+    if await loop.run_in_executor(refingerprint_executor, refingerprint_port, port_name, conn_info):
+        watch_serial_port(loop, port_name, conn_info)
+    elif not port_unplugged(conn_info):
+        await reconnect_serial_port_async(loop, port_name, conn_info)
+
+async def run_simulation_mode_async():
+    """Mode simulation avec données fictives, exécuté sur la boucle asyncio"""
+    global simulation_active
+    simulation_active = True
+    logger.info("🎭 Mode SIMULATION activé")
+    
+    counter = 0
+    last_validation_time = 0
+    
+    while not shutdown_event.is_set():
+        if port_hotplug is not None and port_hotplug.attached.is_set():
+            logger.info("🔌 Capteur branché: fin du mode SIMULATION")
+            return
+        try:
+            counter += 1
+            last_validation_time = simulation_step(counter, last_validation_time)
+        except Exception as e:
+            logger.error(f"❌ Erreur en mode simulation: {e}")
+        await asyncio.sleep(2)
+
+async def serial_ingestion_async() -> Dict[str, Dict[str, Any]]:
+    """
+    Découvre et connecte les ports (dans un exécuteur pour ne pas retarder le
+    serveur WebSocket) puis les enregistre sur la boucle via loop.add_reader
+    Returns: Dictionnaire des connexions surveillées
+    """
+    loop = asyncio.get_running_loop()
+    logger.info("🚀 Démarrage de la lecture des données série (mode asyncio)...")
+    
+    connections = await loop.run_in_executor(None, open_serial_connections)
+    
+    watched = {
+        port_name: conn_info
+        for port_name, conn_info in connections.items()
+        if watch_serial_port(loop, port_name, conn_info)
+    }
+    
+    simulation = None
+    hotplug = start_port_hotplug(connections)
+    if hotplug is not None:
+        def on_attach(port_name, conn_info):
+            nonlocal simulation
+            if simulation is not None:
+                # Fin de la simulation avant toute lecture du port attaché
+                simulation.cancel()
+                simulation = None
+                clear_simulated_values()
+            watch_serial_port(loop, port_name, conn_info)
+        
+        def on_detach(port_name, conn_info):
+            if 'fd' in conn_info:
+                loop.remove_reader(conn_info['fd'])
+        
+        loop.add_reader(hotplug.fileno(), apply_port_events, hotplug, connections, on_attach, on_detach)
+    
+    if not watched:
+        simulation = loop.create_task(run_simulation_mode_async())
+    else:
+        logger.info(f"✅ Lecture démarrée sur {len(watched)} port(s) (mode asyncio)")
+    
+    return connections
+
+async def heartbeat_async():
+    """Log de status périodique (équivalent du heartbeat de main())"""
+    while not shutdown_event.is_set():
+        await asyncio.sleep(60)
+        log_status()
+
+async def async_main():
+    """Point d'entrée du mode asyncio: série + WebSocket sur une seule boucle"""
+    global data_lock
+    
+    # Un seul thread publie les instantanés: le verrou des écrivains devient inutile
+    data_lock = contextlib.nullcontext()
+    
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass
+    
+    open_reading_journal()
+    restore_sensor_state()
+    start_state_snapshots()
+    start_reading_store()
+    server_task = loop.create_task(start_websocket_server())
+    heartbeat_task = loop.create_task(heartbeat_async())
+    connections = await serial_ingestion_async()
+    
+    logger.info("🎯 Tous les services sont actifs (boucle asyncio unique)!")
+    
+    try:
+        await asyncio.wait([server_task, loop.create_task(stop.wait())], return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        logger.info("🛑 Arrêt en cours...")
+        shutdown_event.set()
+        if port_hotplug is not None:
+            loop.remove_reader(port_hotplug.fileno())
+            stop_port_hotplug()
+        for conn_info in connections.values():
+            if 'fd' in conn_info:
+                loop.remove_reader(conn_info['fd'])
+        close_serial_connections(connections)
+        for task in (server_task, heartbeat_task):
+            task.cancel()
+        stop_reading_store()
+        stop_state_snapshots()
+        close_reading_journal()
+
+def log_status():
+    """Log de status: clients connectés et capteurs actifs"""
+    snapshot = current_snapshot
+    active_sensors = active_sensor_keys(snapshot)
+    logger.info(f"💓 Status: Clients={len(connected_clients)}, "
+              f"Capteurs actifs={len(active_sensors)}, "
+              f"Données: {dict((spec.name, snapshot[spec.sensor_id]) for spec in SENSOR_REGISTRY if snapshot[spec.sensor_id] is not None)}, "
+              f"Version: {snapshot.version}, "
+              f"Diffusion: {broadcast_stats.summary()}, "
+              f"Cache: {response_cache.summary()}")
+    if reading_store is not None:
+        logger.info(f"💾 Persistance: {reading_store.summary()}")
+    if reading_journal is not None:
+        reading_journal.flush()
+    logger.info(f"⏱️ Commandes: {command_metrics_summary()}")
+
 def signal_handler(signum):
     """Gestionnaire de signal pour arrêt propre"""
     logger.info(f"🛑 Signal {signum} reçu, arrêt du programme...")
@@ -593,9 +3746,23 @@ def main():
     logger.info("🏥 ===== DÉMARRAGE DE MEDISENSE PRO v3.0 =====")
     logger.info("=" * 60)
     
+    if RUNTIME_MODE == 'asyncio':
+        try:
+            asyncio.run(async_main())
+        except KeyboardInterrupt:
+            logger.info("⏹️ Arrêt demandé par l'utilisateur (Ctrl+C)")
+        logger.info("✅ Programme terminé proprement")
+        logger.info("=" * 60)
+        return
+    
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
     
+    open_reading_journal()
+    restore_sensor_state()
+    start_state_snapshots()
+    start_reading_store()
+    
     try:
         # Lancement du thread de lecture série
         logger.info("🔧 Lancement du thread de lecture série avec détection automatique...")
@@ -651,11 +3818,7 @@ def main():
             
             # Log de status toutes les minutes
             if heartbeat_counter % 6 == 0:
-                with data_lock:
-                    active_sensors = [k for k, v in sensor_data.items() if v is not None]
-                    logger.info(f"💓 Status: Clients={len(connected_clients)}, "
-                              f"Capteurs actifs={len(active_sensors)}, "
-                              f"Données: {dict((k, v) for k, v in sensor_data.items() if v is not None)}")
+                log_status()
             
     except KeyboardInterrupt:
         logger.info("⏹️ Arrêt demandé par l'utilisateur (Ctrl+C)")
@@ -664,6 +3827,9 @@ def main():
     finally:
         logger.info("🛑 Arrêt en cours...")
         shutdown_event.set()
+        stop_reading_store()
+        stop_state_snapshots()
+        close_reading_journal()
         time.sleep(2)
         logger.info("✅ Programme terminé proprement")
         logger.info("=" * 60)
@@ -6,6 +6,8 @@ let reconnectInterval = null;
 let maxReconnectAttempts = 10;
 let reconnectAttempts = 0;
 let autoUpdateInterval = null;
+let subscribed = false;
+let lastSeq = null; // Dernière séquence reçue (reprise après reconnexion)
 let verifCardAccess = "310502";
 
 // === Loader général stylé ===
@@ -299,7 +301,12 @@ function connectWebSocket() {
         };
 
         // Gestion des messages reçus
-        socket.onmessage = function(event) {
+        socket.onmessage = function handleMessage(event) {
+            // Une trame peut contenir plusieurs lignes (réponse à 'resume')
+            if (event.data.includes("\n")) {
+                event.data.split("\n").forEach(line => handleMessage({ data: line }));
+                return;
+            }
             const message = event.data;
             console.log("📨 Message reçu:", message);
             
@@ -317,36 +324,25 @@ function connectWebSocket() {
                             const type = mesures[i];
                             const valeur = mesures[i + 1];
                             
-                            console.log(`📈 Traitement: ${type} = ${valeur}`);
-                            
-                            switch(type) {
-                                case "poids":
-                                    updateCardValue('data-poid', valeur, 'kg');
-                                    break;
-                                case "temperature":
-                                    updateCardValue('data-temperature', valeur, '°C');
-                                    break;
-                                case "taille":
-                                    updateCardValue('data-taille', valeur, 'm');
-                                    break;
-                                case "validation":
-                                    updateCardValue('data-validation', valeur, '');
-                                    // Vérification et reset si besoin
-                                    let valStr = (typeof valeur === "string") ? valeur : String(valeur);
-                                    if (valStr === verifCardAccess) {
-                                        if (socket && socket.readyState === WebSocket.OPEN) {
-                                            socket.send("reset-data");
-                                            console.log("✅ Validation correcte, reset demandé au serveur");
-                                            showGlobalLoader();
-                                            setTimeout(hideGlobalLoader, 3000);
-                                        }
-                                    }
-                                    break;
-                                default:
-                                    console.warn(`⚠️ Type de donnée inconnu: ${type}`);
-                            }
+                            applyMesure(type, valeur);
                         }
                     }
+                } else if (message.startsWith("Delta:")) {
+                    // Changement poussé ou rejoué: Delta:<seq>:<type>:<valeur>
+                    const [, seqStr, type, valeur] = message.split(':');
+                    const seq = parseInt(seqStr, 10);
+                    if (lastSeq === null || seq > lastSeq) {
+                        lastSeq = seq;
+                    }
+                    applyMesure(type, valeur);
+                } else if (message.startsWith("State:")) {
+                    // State:version=..:restored=..:stale=poids,taille:ports=..
+                    const staleField = message.split(':').find(field => field.startsWith("stale="));
+                    const staleTypes = staleField ? staleField.substring(6).split(',').filter(Boolean) : [];
+                    Object.keys(STALE_CARDS).forEach(type => setCardStale(type, staleTypes.includes(type)));
+                } else if (message.startsWith("Resume:")) {
+                    // Resume:OK:<nombre de deltas>, ou Resume:FULL:<seq> si l'historique est dépassé
+                    console.log("⏩ Reprise après reconnexion:", message);
                 } else {
                     // Traitement des messages individuels
                     if (message.startsWith("Poids:")) {
@@ -382,6 +378,16 @@ function connectWebSocket() {
                     else if (message === "pong") {
                         console.log("🏓 Pong reçu du serveur");
                     }
+                    else if (message === "Subscribe:OK") {
+                        // Le serveur pousse désormais chaque nouvelle valeur
+                        console.log("🔔 Abonnement aux mises à jour actif");
+                        subscribed = true;
+                    }
+                    else if (message === "Commande inconnue: subscribe") {
+                        // Ancien serveur sans push: retour à l'interrogation périodique
+                        console.warn("⚠️ Push non supporté par le serveur, interrogation toutes les 2 secondes");
+                        startPolling();
+                    }
                     else {
                         console.log("📝 Autre message:", message);
                     }
@@ -399,6 +405,66 @@ function connectWebSocket() {
     }
 }
 
+// Cartes pouvant afficher une valeur restaurée au redémarrage du serveur
+const STALE_CARDS = {
+    poids: 'data-poid',
+    temperature: 'data-temperature',
+    taille: 'data-taille'
+};
+
+// Grise une carte dont la valeur est périmée (restaurée, pas encore relue)
+function setCardStale(type, stale) {
+    const element = document.getElementById(STALE_CARDS[type]);
+    const card = element ? element.closest('.data-card') : null;
+    if (!card || card.classList.contains('stale') === stale) {
+        return;
+    }
+    card.classList.toggle('stale', stale);
+    card.style.opacity = stale ? '0.5' : '';
+    card.title = stale ? "Mesure précédente (non confirmée)" : '';
+    const cardFooter = card.querySelector('.last-update span');
+    if (cardFooter && stale) {
+        cardFooter.textContent = "Mesure précédente (non confirmée)";
+    }
+}
+
+// Mise à jour de la carte d'une mesure (type:valeur)
+function applyMesure(type, valeur) {
+    console.log(`📈 Traitement: ${type} = ${valeur}`);
+    
+    // Toute valeur reçue après l'état initial est une lecture réelle
+    if (type in STALE_CARDS) {
+        setCardStale(type, false);
+    }
+    
+    switch(type) {
+        case "poids":
+            updateCardValue('data-poid', valeur, 'kg');
+            break;
+        case "temperature":
+            updateCardValue('data-temperature', valeur, '°C');
+            break;
+        case "taille":
+            updateCardValue('data-taille', valeur, 'm');
+            break;
+        case "validation":
+            updateCardValue('data-validation', valeur, '');
+            // Vérification et reset si besoin
+            let valStr = (typeof valeur === "string") ? valeur : String(valeur);
+            if (valStr === verifCardAccess) {
+                if (socket && socket.readyState === WebSocket.OPEN) {
+                    socket.send("reset-data");
+                    console.log("✅ Validation correcte, reset demandé au serveur");
+                    showGlobalLoader();
+                    setTimeout(hideGlobalLoader, 3000);
+                }
+            }
+            break;
+        default:
+            console.warn(`⚠️ Type de donnée inconnu: ${type}`);
+    }
+}
+
 // Fonction pour mettre à jour les valeurs des cartes avec animation améliorée
 function updateCardValue(elementId, value, unit) {
     const element = document.getElementById(elementId);
@@ -510,13 +576,37 @@ function pingServer() {
 
 // Fonctions pour gérer les mises à jour automatiques
 function startAutoUpdate() {
-    console.log("⏰ Démarrage des mises à jour automatiques (toutes les 2 secondes)");
+    console.log("🔔 Démarrage des mises à jour automatiques (abonnement push)");
     
     // Arrêter toute mise à jour existante
     stopAutoUpdate();
     
-    // Première mise à jour immédiate
-    getAllMesures();
+    if (!socket || socket.readyState !== WebSocket.OPEN) {
+        return;
+    }
+    
+    // Le serveur pousse ensuite chaque changement de valeur
+    socket.send("subscribe");
+    
+    if (lastSeq !== null) {
+        // Reconnexion: dernière valeur de chaque mesure modifiée (hors validations,
+        // à usage unique: un code en attente est poussé à l'abonnement)
+        socket.send(`resume ${lastSeq}`);
+    } else {
+        // Première mise à jour immédiate
+        getAllMesures();
+    }
+    
+    // Valeurs restaurées au redémarrage du serveur, grisées jusqu'à leur relecture
+    socket.send("get-state");
+}
+
+function startPolling() {
+    console.log("⏰ Démarrage des mises à jour automatiques (toutes les 2 secondes)");
+    
+    if (autoUpdateInterval) {
+        clearInterval(autoUpdateInterval);
+    }
     
     // Mise à jour toutes les 2 secondes
     autoUpdateInterval = setInterval(() => {
@@ -535,6 +625,13 @@ function stopAutoUpdate() {
         clearInterval(autoUpdateInterval);
         autoUpdateInterval = null;
     }
+    if (subscribed) {
+        console.log("🔕 Désabonnement des mises à jour");
+        if (socket && socket.readyState === WebSocket.OPEN) {
+            socket.send("unsubscribe");
+        }
+        subscribed = false;
+    }
 }
 
 // Fonction pour réinitialiser la connexion
@@ -708,7 +805,8 @@ window.MediSense = {
         return {
             socketState: socket ? socket.readyState : 'Non initialisé',
             reconnectAttempts: reconnectAttempts,
-            autoUpdateActive: !!autoUpdateInterval
+            autoUpdateActive: !!autoUpdateInterval || subscribed,
+            subscribed: subscribed
         };
     }
 };
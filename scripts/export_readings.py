@@ -0,0 +1,104 @@
+"""
+Export ou rejeu des lectures persistées par mesure_server (MEDISENSE_DB).
+
+Formats de sortie:
+  csv     horodatage ISO, epoch, capteur, valeur, port
+  jsonl   un objet JSON par lecture
+  serial  trames 'capteur:valeur' du protocole série, pour rejouer une
+          session vers un port (ex: pty créé par socat), au rythme d'origine
+          avec --realtime
+
+Usage: python scripts/export_readings.py medisense.db [--sensor poids] [--since 2h]
+                                         [--format csv|jsonl|serial] [--realtime]
+"""
+import argparse
+import csv
+import json
+import sqlite3
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import mesure_server  # noqa: E402
+
+
+def query_readings(path, sensor=None, since=None):
+    """Génère les lectures (ts, capteur, valeur, port) dans l'ordre chronologique"""
+    connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        sql = "SELECT ts, sensor, value, port FROM readings"
+        conditions, parameters = [], []
+        if sensor:
+            conditions.append("sensor = ?")
+            parameters.append(sensor)
+        if since is not None:
+            conditions.append("ts >= ?")
+            parameters.append(time.time() - since)
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        yield from connection.execute(sql + " ORDER BY ts", parameters)
+    finally:
+        connection.close()
+
+
+def export_csv(readings, output):
+    writer = csv.writer(output)
+    writer.writerow(["datetime", "ts", "sensor", "value", "port"])
+    for ts, sensor, value, port in readings:
+        writer.writerow([datetime.fromtimestamp(ts).isoformat(timespec='milliseconds'), f"{ts:.3f}", sensor, value, port])
+
+
+def export_jsonl(readings, output):
+    for ts, sensor, value, port in readings:
+        output.write(json.dumps({"ts": ts, "sensor": sensor, "value": value, "port": port}) + "\n")
+
+
+def export_serial(readings, output, realtime=False):
+    previous = None
+    for ts, sensor, value, _ in readings:
+        if realtime and previous is not None and ts > previous:
+            output.flush()
+            time.sleep(ts - previous)
+        previous = ts
+        spec = mesure_server.SENSOR_REGISTRY.resolve(sensor)
+        if spec is not None and spec.is_code:
+            value = int(value)
+        output.write(f"{sensor}:{value}\n")
+
+
+def main(args):
+    if not Path(args.database).exists():
+        sys.exit(f"Base introuvable: {args.database}")
+    since = mesure_server.parse_duration(args.since) if args.since else None
+    if args.since and since is None:
+        sys.exit(f"Durée invalide: {args.since}")
+    if args.sensor and mesure_server.SENSOR_REGISTRY.resolve(args.sensor) is None:
+        sys.exit(f"Capteur inconnu: {args.sensor}")
+    sensor = mesure_server.SENSOR_REGISTRY.resolve(args.sensor).name if args.sensor else None
+
+    readings = query_readings(args.database, sensor, since)
+    output = open(args.output, 'w', newline='') if args.output else sys.stdout
+    try:
+        if args.format == 'csv':
+            export_csv(readings, output)
+        elif args.format == 'jsonl':
+            export_jsonl(readings, output)
+        else:
+            export_serial(readings, output, args.realtime)
+    finally:
+        if args.output:
+            output.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('database', help="base SQLite (MEDISENSE_DB)")
+    parser.add_argument('--sensor', help="capteur (nom ou alias)")
+    parser.add_argument('--since', help="durée: 90, 30s, 15m, 2h, 1d")
+    parser.add_argument('--format', choices=('csv', 'jsonl', 'serial'), default='csv')
+    parser.add_argument('--realtime', action='store_true', help="rejeu au rythme d'origine (format serial)")
+    parser.add_argument('--output', '-o', help="fichier de sortie (défaut: sortie standard)")
+    main(parser.parse_args())